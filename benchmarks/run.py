@@ -0,0 +1,378 @@
+"""
+Benchmarks for the hot paths: map parsing, slider timing / sampling,
+CoordQueue ingestion and matching, coordinate transforms.
+
+    python -m benchmarks.run                      # all, results in benchmarks/results.json
+    python -m benchmarks.run -k queue --quick     # only names containing "queue"
+    python -m benchmarks.run --compare old.json   # exit 1 if anything got slower than --threshold
+
+Each benchmark is timed in repeats of enough calls to take ~min_time
+seconds; min / median / mean / stdev are per call, in seconds. A
+benchmark with a budget_ms fails the run (exit 1) when its median per
+call is over budget.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from modules.coord_queue import CoordQueue, hittable
+from modules.config import OBJ_THRESHOLD, OBJ_COOLDOWN, OBJ_MIN_COUNT
+from modules.hitobject_table import HitObjectTable
+from modules.playfield import PlayfieldTransform, FakeWindowProvider
+from modules.read_map import read_osu_file, prep_osu_objects, compute_slider_timings, Slider
+from modules.simulator import Simulator, SyntheticDetector, VirtualClock
+from modules.slidercalculation import (slider_paths, slider_path, point_at_progress, points_at_progress,
+                                       slide_progress)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SONGS = sorted(glob.glob(os.path.join(ROOT, "test_songs", "*.osu")))
+SCALE_FACTOR = 10  # scaled-up map = the biggest test song repeated this many times
+BENCHMARKS = []
+
+
+def benchmark(name, budget_ms=None):
+    """Register setup() -> fn; fn() is what gets timed, budget_ms is an optional limit per call."""
+    def register(setup):
+        BENCHMARKS.append((name, setup, budget_ms))
+        return setup
+    return register
+
+
+# -------------------------------
+# Scaled-up maps
+# -------------------------------
+def scale_map(src, dst, factor):
+    """Write src repeated factor times back to back (object times shifted) to dst."""
+    with open(src, encoding="utf-8") as f:
+        lines = f.read().splitlines()
+    i = next(i for i, line in enumerate(lines) if line.strip() == "[HitObjects]")
+    header, objects = lines[:i + 1], [line for line in lines[i + 1:] if line.strip()]
+    length = max(int(line.split(",")[2]) for line in objects) + 1000
+
+    out = list(header)
+    for k in range(factor):
+        for line in objects:
+            parts = line.split(",")
+            parts[2] = str(int(parts[2]) + k * length)
+            if int(parts[3]) & 8:  # spinner end time
+                parts[5] = str(int(parts[5]) + k * length)
+            out.append(",".join(parts))
+    with open(dst, "w", encoding="utf-8") as f:
+        f.write("\n".join(out) + "\n")
+    return dst
+
+
+_tmpdir = tempfile.TemporaryDirectory()
+BIGGEST = max(SONGS, key=os.path.getsize)
+SCALED = scale_map(BIGGEST, os.path.join(_tmpdir.name, f"scaled_x{SCALE_FACTOR}.osu"), SCALE_FACTOR)
+MAPS = {"songs": SONGS, f"scaled_x{SCALE_FACTOR}": [SCALED]}
+
+
+# -------------------------------
+# Parsing / slider timing
+# -------------------------------
+for _label, _paths in MAPS.items():
+    @benchmark(f"parse.read_osu_file[{_label}]")
+    def _(paths=_paths):
+        return lambda: [read_osu_file(p) for p in paths]
+
+    @benchmark(f"parse.prep_osu_objects[{_label}]")
+    def _(paths=_paths):
+        return lambda: [prep_osu_objects(p) for p in paths]
+
+    @benchmark(f"timing.compute_slider_timings[{_label}]")
+    def _(paths=_paths):
+        # timing points stay a plain list so building the TimingIndex is part of the timed call
+        maps = [read_osu_file(p)[:3] for p in paths]
+        return lambda: [compute_slider_timings(h, tps, sm) for h, tps, sm in maps]
+
+
+def _sliders(path=BIGGEST):
+    return [obj for obj in prep_osu_objects(path)[0] if isinstance(obj, Slider)]
+
+
+@benchmark("slider.path_build")
+def _():
+    sliders = _sliders()
+    return lambda: [slider_path(s.curveType, [(s.x, s.y)] + list(s.points), s.length) for s in sliders]
+
+
+# single sliders: building one path has to stay well under a millisecond
+PATH_CASES = {
+    "B6": ("B", [(0, 0), (50, 120), (150, -40), (220, 200), (300, 30), (380, 150)], 400),
+    "C5": ("C", [(0, 0), (60, 80), (140, 20), (220, 120), (300, 40)], 380),
+    "P3": ("P", [(0, 0), (80, 90), (200, 40)], 260),
+}
+for _label, (_curve, _cp, _length) in PATH_CASES.items():
+    @benchmark(f"slider.path_build_one[{_label}]", budget_ms=1.0)
+    def _(curve=_curve, cp=_cp, length=_length):
+        return lambda: slider_path(curve, cp, length)
+
+
+@benchmark("slider.path_build_one[most control points]", budget_ms=1.0)
+def _():
+    s = max(_sliders(), key=lambda s: len(s.points))
+    cp = [(s.x, s.y)] + list(s.points)
+    return lambda: slider_path(s.curveType, cp, s.length)
+
+
+@benchmark("slider.point_at_progress")
+def _():
+    pts, dists = slider_paths.get_lists(_sliders()[0])
+    progress = np.linspace(0, 1, 1000).tolist()
+    return lambda: [point_at_progress(pts, dists, p) for p in progress]
+
+
+@benchmark("slider.points_at_progress[1000]")
+def _():
+    pts, dists = slider_paths.get(_sliders()[0])
+    progress = np.linspace(0, 1, 1000)
+    return lambda: points_at_progress(pts, dists, progress)
+
+
+def _osu_input():
+    """modules.osu_input with the mouse calls disabled, or None off Windows."""
+    try:
+        from modules import osu_input
+    except Exception:
+        return None
+    for name in ("set_cursor", "mouse_leftdown", "mouse_leftup"):
+        setattr(osu_input, name, lambda *args: None)
+    return osu_input
+
+
+@benchmark("slider.action_construct")
+def _():
+    osu_input = _osu_input()
+    if osu_input is None:
+        return None
+    sliders = _sliders()
+    return lambda: [osu_input.SliderAction(s) for s in sliders]
+
+
+@benchmark("slider.action_update[1000]")
+def _():
+    osu_input = _osu_input()
+    if osu_input is None:
+        return None
+    osu_input.playfield.provider = FakeWindowProvider()
+    osu_input.playfield.invalidate()
+    s = _sliders()[0]
+    times = np.linspace(s.time, s.end_time - 1, 1000) / 1000
+
+    def run():
+        action = osu_input.SliderAction(s)
+        for t in times:
+            action.update(t)
+    return run
+
+
+@benchmark("slider.update_math[1000]")
+def _():
+    # what SliderAction.update computes, without the mouse calls (runs off Windows)
+    s = _sliders()[0]
+    transform = PlayfieldTransform(FakeWindowProvider())
+    times = (np.linspace(s.time, s.end_time - 1, 1000) / 1000).tolist()
+    start_t, end_t = s.time / 1000, s.end_time / 1000
+    slides = int(s.slides)
+
+    def run():
+        pts, dists = slider_paths.get_lists(s)
+        for t in times:
+            px, py = point_at_progress(pts, dists, slide_progress((t - start_t) / (end_t - start_t), slides))
+            transform.osu_to_screen(px, py)
+    return run
+
+
+# -------------------------------
+# CoordQueue under realistic detection rates
+# -------------------------------
+def _detections(fps, path=BIGGEST, seconds=30):
+    """Hittable DetectionBatches a detector at fps would produce over the first seconds of a map."""
+    hitobjects, _, _, _, ar_delay = prep_osu_objects(path)
+    table = HitObjectTable.from_objects(hitobjects)
+    rng = np.random.default_rng(0)
+    detector = SyntheticDetector(table, ar_delay, PlayfieldTransform(FakeWindowProvider()), rng)
+    start = float(table.time[0])
+    captures = start + np.arange(0, seconds * 1000, 1000 / fps)
+    return [hittable(detector.frame(t).restamp(round(t - start))) for t in captures]
+
+
+for _fps in (30, 60, 144):
+    @benchmark(f"queue.add_batch[{_fps}fps,30s]")
+    def _(fps=_fps):
+        batches = _detections(fps)
+
+        def run():
+            clock = VirtualClock()
+            queue = CoordQueue(OBJ_THRESHOLD, OBJ_COOLDOWN, OBJ_MIN_COUNT, threshold_t=0, clock=clock)
+            for batch in batches:
+                clock.now_ms = float(batch.time_ms[0]) if len(batch) else clock.now_ms
+                queue.add_batch(batch)
+        return run
+
+
+@benchmark("queue.add_remove[60fps,30s]")
+def _():
+    batches = _detections(60)
+
+    def run():
+        clock = VirtualClock()
+        queue = CoordQueue(OBJ_THRESHOLD, OBJ_COOLDOWN, OBJ_MIN_COUNT, threshold_t=0, clock=clock)
+        for batch in batches:
+            if len(batch):
+                clock.now_ms = float(batch.time_ms[0])
+            queue.add_batch(batch)
+            ready = queue.peek_ready(clock.now_ms, 0)
+            if ready is not None:
+                queue.remove(ready)
+    return run
+
+
+@benchmark("match.simulate[biggest song]")
+def _():
+    hitobjects, _, _, _, ar_delay = prep_osu_objects(BIGGEST)
+    table = HitObjectTable.from_objects(hitobjects)
+    return lambda: Simulator(table, ar_delay, seed=0).run()
+
+
+# -------------------------------
+# Coordinate transforms (fake window)
+# -------------------------------
+@benchmark("transform.osu_to_screen[1000]")
+def _():
+    transform = PlayfieldTransform(FakeWindowProvider())
+    pts = np.random.default_rng(0).uniform(0, 512, (1000, 2)).tolist()
+    return lambda: [transform.osu_to_screen(x, y) for x, y in pts]
+
+
+@benchmark("transform.ai_to_osu[1000]")
+def _():
+    transform = PlayfieldTransform(FakeWindowProvider())
+    pts = np.random.default_rng(0).uniform(0, 1000, (1000, 2)).tolist()
+    return lambda: [transform.ai_to_osu(x, y, 1920, 1080) for x, y in pts]
+
+
+@benchmark("transform.ai_to_osu_batch[1000]")
+def _():
+    transform = PlayfieldTransform(FakeWindowProvider())
+    pts = np.random.default_rng(0).uniform(0, 1000, (1000, 2))
+    return lambda: transform.ai_to_osu_batch(pts, 1920, 1080)
+
+
+# -------------------------------
+# Runner
+# -------------------------------
+def time_it(fn, repeats, min_time):
+    fn()  # warm caches / lazy imports
+    number = 1
+    while True:
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        elapsed = time.perf_counter() - t0
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2 if elapsed == 0 else max(2, int(min_time / elapsed * 1.2))
+    runs = [elapsed / number]
+    for _ in range(repeats - 1):
+        t0 = time.perf_counter()
+        for _ in range(number):
+            fn()
+        runs.append((time.perf_counter() - t0) / number)
+    return {
+        "min": min(runs),
+        "median": statistics.median(runs),
+        "mean": statistics.fmean(runs),
+        "stdev": statistics.stdev(runs) if len(runs) > 1 else 0.0,
+        "repeats": repeats,
+        "number": number,
+    }
+
+
+def machine_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Names whose median got more than threshold times slower than in baseline."""
+    regressions = {}
+    for name, stats in results.items():
+        old = baseline.get(name)
+        if not old or "median" not in stats or "median" not in old:
+            continue
+        ratio = stats["median"] / old["median"]
+        if ratio > threshold:
+            regressions[name] = round(ratio, 3)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("-k", dest="select", help="only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="3 short repeats instead of 7")
+    parser.add_argument("--json", default=os.path.join(ROOT, "benchmarks", "results.json"))
+    parser.add_argument("--compare", help="baseline results JSON")
+    parser.add_argument("--threshold", type=float, default=1.2, help="slowdown ratio counted as a regression")
+    args = parser.parse_args(argv)
+
+    repeats, min_time = (3, 0.05) if args.quick else (7, 0.2)
+    results = {}
+    over_budget = {}
+    for name, setup, budget_ms in BENCHMARKS:
+        if args.select and args.select not in name:
+            continue
+        fn = setup()
+        if fn is None:
+            results[name] = {"skipped": "needs Windows (modules.osu_input)"}
+            print(f"{name:45s} skipped")
+            continue
+        results[name] = stats = time_it(fn, repeats, min_time)
+        print(f"{name:45s} {stats['median'] * 1000:12.4f} ms  (min {stats['min'] * 1000:.4f}, "
+              f"stdev {stats['stdev'] * 1000:.4f}, n={stats['number']}x{repeats})")
+        if budget_ms is not None:
+            stats["budget_ms"] = budget_ms
+            if stats["median"] * 1000 > budget_ms:
+                over_budget[name] = round(stats["median"] * 1000, 4)
+                print(f"OVER BUDGET {name}: {stats['median'] * 1000:.4f} ms > {budget_ms} ms")
+
+    report = {"machine": machine_info(), "results": results, "over_budget": over_budget}
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        report["regressions"] = compare(results, baseline, args.threshold)
+        for name, ratio in report["regressions"].items():
+            print(f"REGRESSION {name}: {ratio}x slower")
+
+    with open(args.json, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.json}")
+    return 1 if report.get("regressions") or over_budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
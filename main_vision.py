@@ -2,23 +2,30 @@ import time
 import cv2
 import pyautogui
 from windows_capture import WindowsCapture, Frame, InternalCaptureControl
-import supervision as svi
-from inference import get_model
 from dotenv import load_dotenv
 import os
 import sys
 
 from modules.osu_input import *
 from modules.read_map import *
-from modules.coord_queue import CoordQueue, infer_to_queue
+from modules.beatmap_cache import BeatmapCache
+from modules.coord_queue import CoordQueue
+from modules.detector import create_detector
+from modules.matcher import ObjectMatcher, LiveActions
+from modules.cursor_driver import CursorDriver
+from modules.frame_preprocess import FramePreprocessor, FrameChangeGate
+from modules.preview import PreviewWorker
+from modules.key_poller import KeyPoller
+from modules.metrics import metrics, MetricsDumper
+from modules.scheduler import Scheduler, high_resolution_timer
+from modules.pipeline import LatestSlot, RingBuffer, CapturedFrame, InferenceWorker
 from modules.replicate_songs import queue_to_file
 
 
 load_dotenv()
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'modules'))
 
-latest_frame = None
-current_action = None
+frame_slot = LatestSlot()  # capture -> inference, newest frame only
 
 
 capture = WindowsCapture(
@@ -29,15 +36,13 @@ capture = WindowsCapture(
 )
 
 
-def frame_to_numpy(frame: Frame):
-    buf = frame.frame_buffer
-    return cv2.cvtColor(buf, cv2.COLOR_BGRA2BGR)
+# BGRA frame -> playfield-cropped BGR model input, reusing preallocated buffers
+frame_preprocessor = FramePreprocessor(playfield)
 
 
 @capture.event
 def on_frame_arrived(frame: Frame, capture_control: InternalCaptureControl):
-    global latest_frame
-    latest_frame = frame
+    frame_slot.put(CapturedFrame(frame_slot.seq + 1, frame, time.perf_counter() * 1000))
 
 
 @capture.event
@@ -46,37 +51,45 @@ def on_closed():
     cv2.destroyAllWindows()
 
 
-def main(replicate, replicated_path, song_path):
-    global start_time
-    global osu_index
-    global current_action
+def main(replicate, replicated_path, song_path, headless=False):
     global timing_points
     global slider_multiplier
 
     capture.start_free_threaded()
-    screenshot = None
-
-    # Map Replication
-    if replicate:
-        removed_queue = None
-        queue_record = []
 
     # Prepare variables
-    osu_objects, timing_points, slider_multiplier, time_delay_300, AR_delay = prep_osu_objects(song_path)
-    osu_index = 0
-    current_action = None
+    beatmap_cache = BeatmapCache()
+    osu_objects, timing_points, slider_multiplier, time_delay_300, AR_delay = beatmap_cache.prep(song_path)
+    # slider / spinner cursor positions come from the compiled plan (one lookup per cursor tick)
+    plan = beatmap_cache.trajectory(song_path)
     AR_delay = (AR_delay - AR_DELAY_OFFSET)
 
 
-    # Loading Model
-    model = get_model(
-        model_id=os.getenv('MODEL_ID'),
-        api_key=os.getenv('API_KEY'),
-    )
+    # Loading Model (backend from $DETECTOR_BACKEND), warmed up before the map starts
+    detector = create_detector()
+    detector.warmup()
 
     # Initializing objects queue
     coord_queue = CoordQueue(threshold_dist=OBJ_THRESHOLD, cooldown_time=OBJ_COOLDOWN, min_detect_count=OBJ_MIN_COUNT, threshold_t=0)
 
+    # Inference runs in its own thread: newest frame in, detection batches out
+    detection_buffer = RingBuffer(DETECTION_BUFFER_SIZE)
+    # Optional preview window, rendered on its own thread (nothing at all when headless)
+    preview_slot = None
+    if not headless:
+        preview_slot = LatestSlot()
+        preview = PreviewWorker(preview_slot)
+        preview.start()
+    keys = KeyPoller()
+    keys.start()
+    # per-stage latency histograms, written to METRICS_PATH every few seconds
+    metrics_dumper = MetricsDumper(metrics)
+    metrics_dumper.start()
+    h_queue_add = metrics.histogram("queue_add")
+    h_loop = metrics.histogram("loop")
+    inference = InferenceWorker(detector, frame_slot, detection_buffer, frame_preprocessor,
+                                preview_slot=preview_slot, gate=FrameChangeGate())
+
     # Click Start map on osu! screen
     osu_start_x, osu_start_y = osu_to_screen(320, 170)
     pyautogui.moveTo(osu_start_x, osu_start_y)
@@ -86,131 +99,106 @@ def main(replicate, replicated_path, song_path):
     # Check process name change which indicate map is loaded
     wait_for_title_change(timeout=10)
 
-    first_time = time.perf_counter()
-    while True:
-        if latest_frame is not None:  # Keeping inferring before the game starts
-            screenshot = frame_to_numpy(latest_frame)
-            time_stamp = (time.perf_counter() - first_time) * 1000
-            infer_to_queue(model.infer(screenshot), coord_queue, screenshot, time_stamp)
-        left_click = ctypes.windll.user32.GetAsyncKeyState(0x01) & 0x8000
-        shift_pressed = ctypes.windll.user32.GetAsyncKeyState(0x10) & 0x8000
-        if left_click & shift_pressed:
-            start_time = osu_objects[0].time / 1000
-            osu_index += 1
-            break
-        else:
-            pass
-
-    initial_timestamp = time.perf_counter()
-
-    while osu_index < len(osu_objects):
-        loop_start = time.time()
-        # ========== FRAME PROCESSING ==========
-        if latest_frame is not None:
-            screenshot = frame_to_numpy(latest_frame)
-            results = model.infer(screenshot)
-            time_stamp = (time.perf_counter() - initial_timestamp) * 1000
-            infer_to_queue(results, coord_queue, screenshot, time_stamp)
-
-            # load the results into the supervision Detections api
-            detections = svi.Detections.from_inference(results[0])
-
-            # create supervision annotators
-            bounding_box_annotator = svi.BoxAnnotator()
-            label_annotator = svi.LabelAnnotator()
-
-            # annotate the image with our inference results
-            annotated_image = bounding_box_annotator.annotate(scene=screenshot, detections=detections)
-            annotated_image = label_annotator.annotate(scene=annotated_image, detections=detections)
-            screenshot = annotated_image
-
-            cv2.imshow("Fake Osu!", screenshot)
-
-            results = None
-        ready_to_process = []
-
-        # Iterate through the queue without removing items
-        for coord in coord_queue.queue:
-            # print(now_t, time_detected, AR_delay, now - time_detected)
-            time_stamp = (time.perf_counter() - initial_timestamp) * 1000
-            if (time_stamp) - coord.time_ms >= AR_delay:
-                ready_to_process.append(coord)
-
-        if (current_action is None and ready_to_process)  or isinstance(osu_objects[osu_index], Spinner):
-            if ready_to_process:
-             coord = ready_to_process.pop(0)
-
-            # ========== 2. MATCH TO NEXT OSU OBJECT ==========
-            while (osu_index < len(osu_objects) and current_action is None):
-                obj = osu_objects[osu_index]
-                now_t = time.perf_counter() + start_time - initial_timestamp
-
-                # Match based on expected class logic
-                if isinstance(obj, HitCircle) and coord.cls == "circle":
-                    x, y = ai_to_screen(coord.x, coord.y, coord.screen_x, coord.screen_y)
-                    current_action = CircleAction(obj, x, y)
-                    removed_queue = coord_queue.remove(coord)
-                    break
-
-                if isinstance(obj, Slider):
-                    if now_t >= (obj.time / 1000):
-                        current_action = SliderAction(obj)
-                        removed_queue = coord_queue.remove(coord)
-                        break
-
-                elif isinstance(obj, Spinner):
-                    if now_t >= (obj.time / 1000):
-                        current_action = SpinnerAction(obj)
-                        break
-
-                else:
-                    obj_close = False
-                    skip_steps = 0
-                    for i in range(osu_index, osu_index+OSU_LOOKAHEAD):
-                        if isinstance(osu_objects[i], Slider):
-                            obj_close = True
-                            skip_steps = i-osu_index
-                            break
-                    if obj_close:
-                        print(f"Skipping from {obj} to {coord.cls}. Step is {skip_steps}")
-                        osu_index += skip_steps
-                    else:
-                        coord_queue.remove(coord)
-                        break
-
-        # ========== 3. CREATE ACTION FOR MATCHED OBJECT ==========
-        # print(f"Current action is {current_action}")
-        # ========== 4. UPDATE ONGOING ACTION ==========
-        if current_action is not None:
-            # print(f"Doing action {action}")
-            now_t = time.perf_counter() + start_time - initial_timestamp
-            current_action.update(now_t)
-            if current_action.done:
-                current_action = None
-                osu_index += 1
-
-
-        # ============= FPS Counter =============
-        key = cv2.waitKey(1)
-        if key == ord('f') or (ctypes.windll.user32.GetAsyncKeyState(0x46) & 0x0001):
-            try:
-                print("FPS:", 1 / (time.time() - loop_start))
-            except ZeroDivisionError:
-                pass
-
-        # ============= Exit =============
-        if key == ord('q') or (ctypes.windll.user32.GetAsyncKeyState(0x51) & 0x0001):
-            cv2.destroyAllWindows()
-            break
-
-        # ============= Song Replicate =============
-        if replicate:
-            if removed_queue is not None:
-                queue_record.append(removed_queue)
-                removed_queue = None
-
+    with high_resolution_timer():
+        # ========== BEFORE THE MAP: keep queueing detections until Shift + LeftClick ==========
+        pre_start = Scheduler()
+
+        def ingest():
+            for batch in detection_buffer.drain():  # Keeping inferring before the game starts
+                coord_queue.add_batch(batch)
+
+        def poll_start():
+            left_click = ctypes.windll.user32.GetAsyncKeyState(0x01) & 0x8000
+            shift_pressed = ctypes.windll.user32.GetAsyncKeyState(0x10) & 0x8000
+            if left_click & shift_pressed:
+                pre_start.stop()
+
+        first_time = time.perf_counter()
+        inference.origin_ms = first_time * 1000
+        detection_buffer.on_put = lambda: pre_start.call_soon(ingest, "ingest")
+        pre_start.call_every(START_POLL_MS, poll_start, "start_poll", precise=False)
+        inference.on_error = pre_start.stop
+        inference.start()
+        pre_start.run()
+        inference.check()
+
+        initial_timestamp = time.perf_counter()
+        # one time base for the whole run: detections (queued before and after
+        # the start click) and the matcher clock are ms since first_time, and
+        # start_ms is the map time at that origin
+        clock = lambda: (time.perf_counter() - first_time) * 1000
+        started_ms = (initial_timestamp - first_time) * 1000
+        start_ms = int(osu_objects.time[0]) - started_ms
+
+        # Sliders / spinners are moved by their own fixed-rate thread (CURSOR_RATE_HZ)
+        cursor = CursorDriver(time_fn=lambda: (clock() + start_ms) / 1000)
+        cursor.start()
+
+        # Matching + actions; the first object was clicked by hand
+        matcher = ObjectMatcher(osu_objects, coord_queue, AR_delay, start_ms=start_ms, clock=clock,
+                                actions=LiveActions(cursor, plan))
+        matcher.index = 1
+
+        # ========== DURING THE MAP: run only when something is due ==========
+        # step() runs when detections arrive, when the oldest detection's AR
+        # delay expires, when a slider / spinner starts and when the cursor
+        # driver finishes one; never in a spin loop
+        scheduler = Scheduler(clock=clock)
+        pending_step = [None]
+
+        def step():
+            loop_start = time.perf_counter()
+            # ========== DETECTIONS FROM INFERENCE THREAD ==========
+            batches = detection_buffer.drain()
+            if batches:
+                for batch in batches:
+                    coord_queue.add_batch(batch)
+                h_queue_add.record((time.perf_counter() - loop_start) * 1000)
+
+            # ========== MATCH TO NEXT OSU OBJECT + UPDATE ONGOING ACTION ==========
+            matcher.step()
+            h_loop.record((time.perf_counter() - loop_start) * 1000)
+            if matcher.finished:
+                scheduler.stop()
+                return
+
+            # one pending step event, at the next deadline
+            scheduler.cancel(pending_step[0])
+            deadline = matcher.next_deadline(ACTION_UPDATE_MS)
+            pending_step[0] = None if deadline is None else scheduler.call_at(deadline, step, "step")
+
+        def check_keys():
+            # ============= Stage latencies (p50 / p99) =============
+            if keys.consume("f"):
+                print(metrics.report())
+                print(inference.stats(), cursor.stats())
+
+            # ============= Exit =============
+            if keys.consume("q"):
+                scheduler.stop()
+
+        # a dead inference thread would leave nothing to click: stop and re-raise below
+        inference.on_error = scheduler.stop
+        if inference.error is not None:
+            scheduler.stop()
+        detection_buffer.on_put = lambda: scheduler.call_soon(step, "detections")
+        cursor.on_done = lambda: scheduler.call_soon(step, "action_done")
+        scheduler.call_every(KEY_POLL_INTERVAL * 1000, check_keys, "keys", precise=False)
+        scheduler.call_soon(step, "step")
+        scheduler.run()
+        cursor.stop()
+
+    inference.stop()
+    detector.close()
+    keys.stop()
+    metrics_dumper.stop()
+    if not headless:
+        preview.stop()
+    inference.check()
+
+    # ============= Song Replicate =============
     if replicate:
-        queue_to_file(queue_record, replicated_path)
+        queue_to_file(matcher.removed, replicated_path, time_offset_ms=-started_ms)
 
 if __name__ == "__main__":
     # pyautogui.PAUSE = 0.05
@@ -0,0 +1,175 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+
+from .config import BEATMAP_CACHE_DIR, BEATMAP_CACHE_MAX_MB, TRAJECTORY_RATE_HZ, CLICK_HOLD_MS, SPINNER_RPM, SPINNER_RADIUS
+from .read_map import PARSER_VERSION, TimingPoint, prep_osu_objects
+from .hitobject_table import HitObjectTable
+from .slidercalculation import PATH_TOLERANCE, slider_paths
+from .trajectory import TrajectoryPlan, compile_trajectory
+
+META_FILE = "meta.json"
+
+
+def beatmap_key(filepath):
+    """Cache key: hash of the .osu file contents + parser version."""
+    h = hashlib.sha1()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    h.update(f"parser-v{PARSER_VERSION}".encode())
+    return h.hexdigest()
+
+
+class BeatmapCache:
+    """
+    On-disk cache of prepared beatmaps.
+
+    Each entry is a directory named after beatmap_key() holding one .npy
+    file per HitObjectTable column (memory-mapped copy-on-write, so a
+    loaded table can be modified like a fresh one without touching the
+    cache files) and a meta.json
+    with timing points and derived difficulty values. Entries are touched
+    on every hit; once the cache grows past max_mb the least recently used
+    entries are evicted.
+    """
+    def __init__(self, cache_dir=BEATMAP_CACHE_DIR, max_mb=BEATMAP_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _entry_dir(self, key):
+        return os.path.join(self.cache_dir, key)
+
+    # -------------------------------
+    # Load / store
+    # -------------------------------
+    def load(self, key):
+        entry = self._entry_dir(key)
+        meta_path = os.path.join(entry, META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, "r", encoding="utf8") as f:
+                meta = json.load(f)
+            arrays = [np.load(os.path.join(entry, name + ".npy"), mmap_mode="c")
+                      for name in HitObjectTable.ARRAY_COLUMNS]
+        except (OSError, ValueError):
+            # half-written or corrupted entry
+            shutil.rmtree(entry, ignore_errors=True)
+            return None
+        if meta.get("parser_version") != PARSER_VERSION:
+            return None
+
+        table = HitObjectTable(*arrays, np.array(meta["extras"], dtype=object))
+        timing_points = [TimingPoint(*tp) for tp in meta["timing_points"]]
+
+        os.utime(entry)  # mark as recently used
+        return table, timing_points, meta["slider_multiplier"], meta["time_delay_300"], meta["AR_delay"]
+
+    def store(self, key, table, timing_points, slider_multiplier, time_delay_300, AR_delay):
+        entry = self._entry_dir(key)
+        if os.path.exists(entry):
+            return
+
+        tmp = tempfile.mkdtemp(prefix=key + ".", dir=self.cache_dir)
+        try:
+            for name in HitObjectTable.ARRAY_COLUMNS:
+                np.save(os.path.join(tmp, name + ".npy"), np.ascontiguousarray(getattr(table, name)))
+            meta = {
+                "parser_version": PARSER_VERSION,
+                "slider_multiplier": slider_multiplier,
+                "time_delay_300": time_delay_300,
+                "AR_delay": AR_delay,
+                "timing_points": [list(vars(tp).values()) for tp in timing_points],
+                "extras": list(table.extras),
+            }
+            # meta.json is written last, an entry without it is never loaded
+            with open(os.path.join(tmp, META_FILE), "w", encoding="utf8") as f:
+                json.dump(meta, f)
+            os.replace(tmp, entry)
+        except OSError:
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
+
+    # -------------------------------
+    # LRU eviction
+    # -------------------------------
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            path = self._entry_dir(name)
+            if not os.path.isdir(path) or "." in name:
+                continue
+            size = sum(e.stat().st_size for e in os.scandir(path) if e.is_file())
+            entries.append((os.stat(path).st_mtime, size, path))
+        return entries
+
+    def size(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def evict(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        # keep at least the newest entry even if it alone is over the cap
+        while total > self.max_bytes and len(entries) > 1:
+            _, size, path = entries.pop(0)
+            shutil.rmtree(path, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for _, _, path in self._entries():
+            shutil.rmtree(path, ignore_errors=True)
+
+    # -------------------------------
+    # Main entry point
+    # -------------------------------
+    def prep(self, filepath, precompute_paths=None):
+        """
+        Cached prep_osu_objects(). Returns the same tuple except hit
+        objects come back as a HitObjectTable.
+        """
+        key = beatmap_key(filepath)
+        cached = self.load(key)
+        if cached is not None:
+            if precompute_paths:
+                slider_paths.precompute(cached[0], mode=precompute_paths)
+            return cached
+
+        hitobjects, timing_points, slider_multiplier, time_delay_300, AR_delay = prep_osu_objects(filepath, precompute_paths)
+        table = HitObjectTable.from_objects(hitobjects)
+        self.store(key, table, timing_points, slider_multiplier, time_delay_300, AR_delay)
+        return table, timing_points, slider_multiplier, time_delay_300, AR_delay
+
+    def trajectory(self, filepath, rate_hz=TRAJECTORY_RATE_HZ, click_ms=CLICK_HOLD_MS,
+                   spinner_rpm=SPINNER_RPM, spinner_radius=SPINNER_RADIUS):
+        """
+        Compiled TrajectoryPlan for the map, stored next to the prepared
+        beatmap (so it shares its LRU entry) and loaded memory-mapped. The
+        file name carries every parameter the plan depends on, slider path
+        tolerance included, so changing one compiles a new plan.
+        main_vision drives sliders / spinners from it (PlannedAction); it
+        is also what runs / replays are compared against.
+        """
+        key = beatmap_key(filepath)
+        table = self.prep(filepath)[0]
+        plan_name = (f"plan_{rate_hz:g}hz_click{click_ms:g}_rpm{spinner_rpm:g}"
+                     f"_r{spinner_radius:g}_tol{PATH_TOLERANCE:g}.npy")
+        plan_path = os.path.join(self._entry_dir(key), plan_name)
+        if os.path.exists(plan_path):
+            try:
+                return TrajectoryPlan.load(plan_path)
+            except (OSError, ValueError):
+                pass
+
+        plan = compile_trajectory(table, rate_hz=rate_hz, click_ms=click_ms,
+                                  spinner_rpm=spinner_rpm, spinner_radius=spinner_radius)
+        if os.path.isdir(self._entry_dir(key)):
+            plan.save(plan_path)
+            self.evict()
+        return plan
@@ -10,8 +10,65 @@ OBJ_MIN_CONFIDENCE = 0.80
 OBJ_THRESHOLD = 25
 OBJ_COOLDOWN = 0.2
 OBJ_MIN_COUNT = 3
+OBJ_TRACK_TTL = 250          # in ms, unconfirmed detections are forgotten after this
+OBJ_TRACK_MAX = 256
 AR_DELAY_OFFSET = 200       # in ms, bigger is faster
 OSU_LOOKAHEAD = 5
 
+TRAJECTORY_RATE_HZ = 1000   # samples per second of compiled cursor plans
+CLICK_HOLD_MS = 20          # how long a circle click is held in compiled plans
+SPINNER_RPM = 300
+SPINNER_RADIUS = 50         # in osu px
+
+PLAYFIELD_REFRESH_S = 0.5   # re-read the osu! window rect at most this often
+DETECTION_BUFFER_SIZE = 8   # detection batches buffered between inference and matching
+
+FRAME_CROP_PLAYFIELD = True # feed the model only the playfield (+ margin), not the whole window
+FRAME_CROP_MARGIN = 0.1     # margin around the playfield, as a fraction of its height
+FRAME_TARGET_SIZE = None    # (width, height) to downscale model input to, None keeps crop size
+FRAME_POOL_SIZE = 3         # preallocated output buffers, used round-robin
+
+FRAME_GATE_SIZE = (32, 24)  # thumbnail used to detect frame changes
+FRAME_GATE_THRESHOLD = 6  # grey-level difference in any thumbnail cell that counts as a change
+FRAME_GATE_MAX_SKIP_MS = 25  # run inference at least this often even if nothing changed (keep far below the hit window)
+
+PREVIEW_MAX_FPS = 30        # cap for the annotated preview window
+KEY_POLL_INTERVAL = 0.02    # in seconds, how often f / q keys are polled
+
+DETECTOR_BACKEND = "roboflow"   # "roboflow" (inference.get_model), "onnx" or "stub"
+ONNX_MODEL_PATH = "./models/osu.onnx"
+ONNX_THREADS = 4            # intra-op threads for ONNX Runtime on CPU
+ONNX_INPUT_SIZE = None      # (width, height), None reads it from the model
+ONNX_CONF_THRESHOLD = 0.25  # boxes below this are dropped before NMS
+ONNX_IOU_THRESHOLD = 0.5    # NMS overlap threshold
+DETECTOR_WARMUP_RUNS = 3    # dummy inferences before the map starts
+DETECTOR_BATCH_SIZE = 4     # frames per batched inference when replicating maps
+
+SCHED_SPIN_MS = 1.0         # spin instead of sleeping for the last ms before a deadline
+ACTION_UPDATE_MS = 1.0      # how often a running slider / spinner action is updated
+CURSOR_RATE_HZ = 1000       # cursor driver updates per second for sliders / spinners
+START_POLL_MS = 10.0        # shift + click start check before the map
+TITLE_POLL_MS = 10.0        # osu! window title check while the map loads
+
+METRICS_PATH = "./metrics.json"  # *.prom / *.txt for Prometheus text format
+METRICS_DUMP_INTERVAL = 5.0 # in seconds
+METRICS_SIGNIFICANT_DIGITS = 2
+METRICS_MAX_MS = 60000      # larger values are clamped
+
+SIM_DETECTOR_FPS = 30       # offline simulator (modules/simulator.py) defaults
+SIM_LATENCY_MS = 60         # capture -> detections available
+SIM_LATENCY_JITTER_MS = 10
+SIM_JITTER_PX = 3.0         # std dev of detection position noise, in image px
+SIM_CONFIDENCE = 0.9
+SIM_CONFIDENCE_NOISE = 0.05
+SIM_DROP_RATE = 0.05        # whole frames lost
+SIM_MISS_RATE = 0.05        # single objects not detected in a frame
+SIM_FALSE_POSITIVES = 0.1   # mean spurious detections per frame
+SIM_TICK_MS = 1.0           # virtual main loop period
+
+BEATMAP_CACHE_DIR = "./.beatmap_cache"
+BEATMAP_CACHE_MAX_MB = 256
+LIBRARY_DB_PATH = "./beatmap_library.sqlite"
+
 if __name__ == "__main__":
     pass
\ No newline at end of file
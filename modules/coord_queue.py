@@ -1,65 +1,28 @@
-from collections import deque
+from collections import deque, OrderedDict
+import bisect
+import heapq
+import itertools
 import time
 import math
-from .config import *
-from .osu_input import ai_to_screen, get_osu_client_rect
 
-def ai_to_screen(ai_x, ai_y, image_width, image_height):
-    left, top, right, bottom = get_osu_client_rect()
-    osu_width = right - left
-    osu_height = bottom - top
+import numpy as np
+
+from .config import *
+from .playfield import playfield
 
-    # scale from screenshot → osu window
-    screen_x = left + (ai_x / image_width) * osu_width
-    screen_y = top + (ai_y / image_height) * osu_height
-    return int(screen_x), int(screen_y)
+def hittable(batch):
+    """Circles and slider heads above OBJ_MIN_CONFIDENCE."""
+    return batch.filter(classes=("circle", "slider_head"), min_confidence=OBJ_MIN_CONFIDENCE)
 
+def detections_from_results(results, image_shape, time_ms):
+    """Model results -> DetectionBatch of hittable objects above OBJ_MIN_CONFIDENCE."""
+    return hittable(DetectionBatch.from_predictions(results[0].predictions, image_shape, time_ms))
 
 def infer_to_queue(results, coord_queue, screenshot, now_t):
-    clean = [
-        {
-            "class": p.class_name,
-            "confidence": float(p.confidence),
-            "x": float(p.x),
-            "y": float(p.y),
-            "width": float(p.width),
-            "height": float(p.height),
-            "time_ms": round(now_t),
-            "screen_x": int(screenshot.shape[1]),
-            "screen_y": int(screenshot.shape[0])
-        }
-        for p in results[0].predictions
-    ]
-    for item in clean:
-        if item['class'] not in {"circle", "slider_head"}:
-            continue
-        if item['confidence'] < OBJ_MIN_CONFIDENCE:
-            continue
-        data_ai = DataAI(item)
-        coord_queue.add(data_ai)
+    coord_queue.add_batch(detections_from_results(results, screenshot.shape, round(now_t)))
 
 def screen_to_osu(screen_x, screen_y):
-    # Get CLIENT RECT
-    left, top, right, bottom = get_osu_client_rect()
-    osu_w = right - left
-    osu_h = bottom - top
-
-    # Compute playfield size
-    play_h = 0.8 * osu_h
-    play_w = (4 / 3) * play_h
-
-    # Centering + 2% vertical offset (same as forward)
-    play_left = (osu_w - play_w) / 2
-    play_top  = (osu_h - play_h) / 2 + play_h * 0.02
-
-    # osu px → screen px scale
-    osu_scale = play_h / 384   # equivalent to play_w / 512
-
-    # Reverse the transform
-    osu_x = (screen_x - play_left - left) / osu_scale
-    osu_y = (screen_y - play_top  - top) / osu_scale
-
-    return int(osu_x), int(osu_y)
+    return playfield.screen_to_osu(screen_x, screen_y)
 
 # def find_disappeared_coords(old_list, new_list, thresh=30):
 #     disappeared = []
@@ -76,6 +39,8 @@ def screen_to_osu(screen_x, screen_y):
 
 
 class DataAI:
+    __slots__ = ("cls", "x", "y", "screen_x", "screen_y", "width", "height", "time_ms")
+
     def __init__(self, obj):
         self.cls = obj['class']
         self.x = obj['x']
@@ -86,21 +51,261 @@ class DataAI:
         self.height = obj['height']
         self.time_ms = obj['time_ms']
 
+    @classmethod
+    def from_values(cls, cls_name, x, y, width, height, time_ms, screen_x, screen_y):
+        data_ai = cls.__new__(cls)
+        data_ai.cls = cls_name
+        data_ai.x = x
+        data_ai.y = y
+        data_ai.width = width
+        data_ai.height = height
+        data_ai.time_ms = time_ms
+        data_ai.screen_x = screen_x
+        data_ai.screen_y = screen_y
+        return data_ai
+
     def get_osu_coords(self):
-        screen_x, screen_y = ai_to_screen(self.x, self.y, self.screen_x, self.screen_y) 
-        osu_x, osu_y  = screen_to_osu(screen_x, screen_y) 
-        return osu_x, osu_y
+        return playfield.ai_to_osu(self.x, self.y, self.screen_x, self.screen_y)
+
+
+# class name <-> id, shared by every DetectionBatch
+CLASS_IDS = {}
+CLASS_NAMES = []
+
+def class_id(name):
+    cid = CLASS_IDS.get(name)
+    if cid is None:
+        cid = CLASS_IDS[name] = len(CLASS_NAMES)
+        CLASS_NAMES.append(name)
+    return cid
+
+
+class DetectionBatch:
+    """
+    One frame's detections as NumPy columns (class id, confidence, x, y,
+    w, h, capture timestamp). Filtering is a boolean mask over the
+    columns; DataAI objects are only created for rows that are used.
+    """
+    def __init__(self, class_id, confidence, x, y, width, height, time_ms, screen_x, screen_y):
+        self.class_id = class_id
+        self.confidence = confidence
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.time_ms = time_ms
+        self.screen_x = screen_x  # image width
+        self.screen_y = screen_y  # image height
+
+    @classmethod
+    def from_predictions(cls, predictions, image_shape, time_ms):
+        n = len(predictions)
+        values = np.array([(p.confidence, p.x, p.y, p.width, p.height) for p in predictions],
+                          dtype=np.float64).reshape(n, 5)
+        class_ids = np.fromiter((class_id(p.class_name) for p in predictions), dtype=np.int16, count=n)
+        return cls(class_ids, values[:, 0], values[:, 1], values[:, 2], values[:, 3], values[:, 4],
+                   np.full(n, time_ms, dtype=np.int64), int(image_shape[1]), int(image_shape[0]))
+
+    @classmethod
+    def empty(cls, image_shape):
+        return cls(np.zeros(0, dtype=np.int16), *(np.zeros(0) for _ in range(5)),
+                   np.zeros(0, dtype=np.int64), int(image_shape[1]), int(image_shape[0]))
+
+    def __len__(self):
+        return len(self.class_id)
+
+    def select(self, mask):
+        return DetectionBatch(self.class_id[mask], self.confidence[mask], self.x[mask], self.y[mask],
+                              self.width[mask], self.height[mask], self.time_ms[mask],
+                              self.screen_x, self.screen_y)
+
+    def filter(self, classes=None, min_confidence=None):
+        mask = np.ones(len(self), dtype=bool)
+        if classes is not None:
+            mask &= np.isin(self.class_id, [class_id(name) for name in classes])
+        if min_confidence is not None:
+            mask &= self.confidence >= min_confidence
+        return self.select(mask)
+
+    def restamp(self, time_ms):
+        """Same detections with a new timestamp."""
+        return DetectionBatch(self.class_id, self.confidence, self.x, self.y, self.width, self.height,
+                              np.full(len(self), time_ms, dtype=np.int64), self.screen_x, self.screen_y)
+
+    def to_frame(self, mapping):
+        """
+        Map coordinates from a cropped / resized model image back to the
+        full captured frame (see FrameMapping), so ai_to_screen keeps working.
+        """
+        return DetectionBatch(self.class_id, self.confidence,
+                              mapping.offset_x + self.x / mapping.scale_x,
+                              mapping.offset_y + self.y / mapping.scale_y,
+                              self.width / mapping.scale_x, self.height / mapping.scale_y,
+                              self.time_ms, mapping.frame_w, mapping.frame_h)
+
+    def __getitem__(self, i):
+        return DataAI.from_values(CLASS_NAMES[self.class_id[i]], float(self.x[i]), float(self.y[i]),
+                                  float(self.width[i]), float(self.height[i]), int(self.time_ms[i]),
+                                  self.screen_x, self.screen_y)
+
+    def __iter__(self):
+        names = CLASS_NAMES
+        for cid, x, y, w, h, t in zip(self.class_id.tolist(), self.x.tolist(), self.y.tolist(),
+                                      self.width.tolist(), self.height.tolist(), self.time_ms.tolist()):
+            yield DataAI.from_values(names[cid], x, y, w, h, t, self.screen_x, self.screen_y)
+
+
+class SpatialGrid:
+    """
+    Uniform hash grid: items are bucketed by (x // cell_size, y // cell_size),
+    so anything within cell_size of a point is in its 3x3 neighbourhood.
+    """
+    def __init__(self, cell_size):
+        self.cell_size = max(float(cell_size), 1.0)
+        self.cells = {}
+
+    def _cell(self, x, y):
+        return (int(x // self.cell_size), int(y // self.cell_size))
+
+    def insert(self, x, y, item):
+        self.cells.setdefault(self._cell(x, y), []).append(item)
+
+    def remove(self, x, y, item):
+        cell = self._cell(x, y)
+        bucket = self.cells.get(cell)
+        if bucket is None:
+            return
+        for i, other in enumerate(bucket):
+            if other is item:
+                bucket.pop(i)
+                break
+        if not bucket:
+            del self.cells[cell]
+
+    def nearby(self, x, y):
+        cx, cy = self._cell(x, y)
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                bucket = self.cells.get((cx + dx, cy + dy))
+                if bucket:
+                    yield from bucket
+
+    def clear(self):
+        self.cells.clear()
+
+
+class Track:
+    __slots__ = ("x", "y", "cls", "hits", "last_seen")
+
+    def __init__(self, x, y, cls, now_ms):
+        self.x = x
+        self.y = y
+        self.cls = cls
+        self.hits = 0
+        self.last_seen = now_ms
+
+
+class DetectionTracker:
+    """
+    Short-lived tracks of repeated detections. A detection within
+    threshold_dist of a live track of the same class counts as another hit
+    of that track (so detector jitter doesn't start a new one). A track is
+    dropped once it reaches min_detect_count (a later detection there has
+    to be confirmed again) or when not seen for ttl_ms, and at most
+    max_tracks are kept. Ages are measured on clock() (monotonic ms), not
+    on detection timestamps, whose origin can change.
+    """
+    def __init__(self, threshold_dist=25, min_detect_count=5, ttl_ms=OBJ_TRACK_TTL, max_tracks=OBJ_TRACK_MAX,
+                 clock=None):
+        self.clock = clock or (lambda: time.perf_counter() * 1000)
+        self.threshold_dist = threshold_dist
+        self.min_detect_count = min_detect_count
+        self.ttl_ms = ttl_ms
+        self.max_tracks = max_tracks
+        self.grid = SpatialGrid(threshold_dist)
+        self.tracks = OrderedDict()  # id(track) -> track, least recently seen first
+
+    def _drop(self, track):
+        del self.tracks[id(track)]
+        self.grid.remove(track.x, track.y, track)
+
+    def _evict(self, now_ms):
+        while self.tracks:
+            oldest = next(iter(self.tracks.values()))
+            if len(self.tracks) <= self.max_tracks and now_ms - oldest.last_seen <= self.ttl_ms:
+                break
+            self._drop(oldest)
+
+    def _nearest(self, x, y, cls):
+        best, best_d = None, None
+        for track in self.grid.nearby(x, y):
+            if track.cls != cls:
+                continue
+            d = math.hypot(track.x - x, track.y - y)
+            if d <= self.threshold_dist and (best_d is None or d < best_d):
+                best, best_d = track, d
+        return best
+
+    def observe(self, data_ai, now_ms=None):
+        """Record a detection, returns True once its track has min_detect_count hits."""
+        return self.hit(data_ai.x, data_ai.y, data_ai.cls, now_ms)
+
+    def hit(self, x, y, cls, now_ms=None):
+        """observe() on plain values, for batch rows that have no DataAI yet."""
+        now_ms = self.clock() if now_ms is None else now_ms
+        self._evict(now_ms)
+
+        track = self._nearest(x, y, cls)
+        if track is None:
+            track = Track(x, y, cls, now_ms)
+            self.tracks[id(track)] = track
+            self.grid.insert(track.x, track.y, track)
+        else:
+            # follow the latest position
+            self.grid.remove(track.x, track.y, track)
+            track.x, track.y = x, y
+            self.grid.insert(track.x, track.y, track)
+            self.tracks.move_to_end(id(track))
+
+        track.hits += 1
+        track.last_seen = now_ms
+        if track.hits >= self.min_detect_count:
+            self._drop(track)
+            return True
+        self._evict(now_ms)
+        return False
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def clear(self):
+        self.tracks.clear()
+        self.grid.clear()
 
 
 class CoordQueue:
-    def __init__(self, threshold_dist=25, cooldown_time=0.2, min_detect_count=5, threshold_t=1200):
+    def __init__(self, threshold_dist=25, cooldown_time=0.2, min_detect_count=5, threshold_t=1200, clock=None):
         self.queue = []
+        # ms clock for cooldowns, a virtual one when simulating
+        self.clock = clock or (lambda: time.perf_counter() * 1000)
         self.threshold_dist = threshold_dist
         self.threshold_t = threshold_t
         self.cooldown_time = cooldown_time  # seconds
-        self.cooldown_coords = []  # list of coords on cooldown
         self.min_detect_count = min_detect_count  # how many frames required
-        self.detect_counts = {}  # store repeated detections
+        self.tracker = DetectionTracker(threshold_dist, min_detect_count, clock=self.clock)  # repeated detections
+
+        # spatial lookups for queued / cooling-down coords (cells of threshold_dist)
+        self._queue_grid = SpatialGrid(threshold_dist)
+        # self.queue is kept sorted by (time_ms, insertion number), _queue_keys mirrors it
+        self._queue_keys = []
+        self._queue_order = {}  # id(DataAI) -> (time_ms, insertion number)
+        self._cooldown_grid = SpatialGrid(threshold_dist)
+        self._cooldown_heap = []  # (expire, n, coord), earliest expiry first
+        self._counter = itertools.count()
+
+    @property
+    def cooldown_coords(self):
+        return [(coord, expire) for (expire, _, coord) in self._cooldown_heap]
 
     # -------------------------------
     # Helper: same coord and time detection
@@ -115,62 +320,103 @@ class CoordQueue:
         t2 = data_ai_2.time_ms
         return abs(t1 - t2) <= self.threshold_t
 
+    def _has_queued_time(self, time_ms):
+        i = bisect.bisect_left(self._queue_keys, (time_ms - self.threshold_t,))
+        return i < len(self._queue_keys) and self._queue_keys[i][0] <= time_ms + self.threshold_t
+
+    def _unlink(self, item):
+        key = self._queue_order.pop(id(item))
+        i = bisect.bisect_left(self._queue_keys, key)
+        del self._queue_keys[i]
+        del self.queue[i]
+        self._queue_grid.remove(item.x, item.y, item)
+
     # -------------------------------
     # Remove expired cooldown entries
     # -------------------------------
     def _cleanup_cooldown(self):
-        now = time.perf_counter()*1000
-        self.cooldown_coords = [
-            (coord, expire)
-            for (coord, expire) in self.cooldown_coords
-            if expire > now
-        ]
+        now = self.clock()
+        heap = self._cooldown_heap
+        while heap and heap[0][0] <= now:
+            _, _, coord = heapq.heappop(heap)
+            self._cooldown_grid.remove(coord.x, coord.y, coord)
     # -------------------------------
-    # Check if coord is in cooldown
+    # Check if coord is in cooldown / already queued (plain values, no DataAI needed)
     # -------------------------------
-    def _is_in_cooldown(self, data_ai: DataAI):
-        now = time.perf_counter()*1000
-        x, y, cls = data_ai.x, data_ai.y, data_ai.cls
-        for (recent_coord, expire) in self.cooldown_coords:
-            if recent_coord.cls == cls and self._same_dist(data_ai, recent_coord) and expire > now:
+    def _in_cooldown(self, x, y, cls):
+        thr = self.threshold_dist
+        for recent_coord in self._cooldown_grid.nearby(x, y):
+            if recent_coord.cls == cls and math.hypot(recent_coord.x - x, recent_coord.y - y) <= thr:
                 return True
         return False
 
+    def _is_queued(self, x, y, time_ms):
+        # any class
+        if self._has_queued_time(time_ms):
+            return True
+        thr = self.threshold_dist
+        for data_ai_q in self._queue_grid.nearby(x, y):
+            if math.hypot(data_ai_q.x - x, data_ai_q.y - y) <= thr:
+                return True
+        return False
+
+    def _is_in_cooldown(self, data_ai: DataAI):
+        return self._in_cooldown(data_ai.x, data_ai.y, data_ai.cls)
+
+    def _insert(self, data_ai: DataAI):
+        # in time order, usually at the end
+        key = (data_ai.time_ms, next(self._counter))
+        i = bisect.bisect_right(self._queue_keys, key)
+        self._queue_keys.insert(i, key)
+        self.queue.insert(i, data_ai)
+        self._queue_order[id(data_ai)] = key
+        self._queue_grid.insert(data_ai.x, data_ai.y, data_ai)
+        # print(f"[Queue] Added: ({data_ai.x}, {data_ai.y}, {data_ai.cls}, {data_ai.time_ms})  size={len(self.queue)}")
+
     # -------------------------------
     # Add coordinate (with cooldown check)
     # -------------------------------
     def add(self, data_ai: DataAI):
         self._cleanup_cooldown()
-        x, y, cls = data_ai.x, data_ai.y, data_ai.cls
-        time_ms = data_ai.time_ms
         # 1. Check cooldown
         if self._is_in_cooldown(data_ai):
             return False
 
-        # 2. Check if already in queue
-        for data_ai_q in self.queue:
-            if data_ai.cls == cls:
-                if self._same_time(data_ai, data_ai_q):
-                    return False
-                if self._same_dist(data_ai, data_ai_q):
-                    return False
-
-        # Increment detection count
-        key = (x, y, cls)
-        if key not in self.detect_counts:
-            self.detect_counts[key] = 1
-        else:
-            self.detect_counts[key] += 1
+        # 2. Check if already in queue (any class)
+        if self._is_queued(data_ai.x, data_ai.y, data_ai.time_ms):
+            return False
 
+        # Count the detection on its track
         # Not enough detections yet → ignore
-        if self.detect_counts[key] < self.min_detect_count:
+        if not self.tracker.observe(data_ai):
             return False
 
         # 3. Add normally
-        self.queue.append(data_ai)
-        # print(f"[Queue] Added: ({x}, {y}, {cls}, {time_ms})  size={len(self.queue)}")
+        self._insert(data_ai)
         return True
 
+    def add_batch(self, batch: DetectionBatch):
+        """
+        Same as add() for every row of a DetectionBatch, returns how many
+        were queued. The checks run on the row's column values; a DataAI is
+        only made for the rows that actually get queued.
+        """
+        if not len(batch):
+            return 0
+        self._cleanup_cooldown()
+        names = CLASS_NAMES
+        added = 0
+        for i, (cid, x, y, time_ms) in enumerate(zip(batch.class_id.tolist(), batch.x.tolist(),
+                                                     batch.y.tolist(), batch.time_ms.tolist())):
+            cls = names[cid]
+            if self._in_cooldown(x, y, cls) or self._is_queued(x, y, time_ms):
+                continue
+            if not self.tracker.hit(x, y, cls):
+                continue
+            self._insert(batch[i])
+            added += 1
+        return added
+
     # -------------------------------
     # Pop the next item of given class
     # -------------------------------
@@ -205,18 +451,44 @@ class CoordQueue:
     # Manual removal (optional)
     # -------------------------------
     def remove(self, coord):
-        for i, item in enumerate(self.queue):
-            # Match class & distance condition
-            if item.cls == coord.cls and self._same_dist(coord, item):
-                # Pop the item
-                removed = self.queue.pop(i)
-
-                # Add to cooldown with timestamp
-                expire_time = (time.perf_counter()*1000) + (self.cooldown_time*1000)
-                self.cooldown_coords.append((removed, expire_time))
-                # print(f"[Queue] Force-removed: {removed}")
-                return removed
-        return False
+        # Match class & distance condition, oldest queued item first
+        matches = [item for item in self._queue_grid.nearby(coord.x, coord.y)
+                   if item.cls == coord.cls and self._same_dist(coord, item)]
+        if not matches:
+            return False
+        removed = min(matches, key=lambda item: self._queue_order[id(item)])
+
+        # Pop the item
+        self._unlink(removed)
+
+        # Add to cooldown with timestamp
+        expire_time = self.clock() + (self.cooldown_time*1000)
+        heapq.heappush(self._cooldown_heap, (expire_time, next(self._counter), removed))
+        self._cooldown_grid.insert(removed.x, removed.y, removed)
+        # print(f"[Queue] Force-removed: {removed}")
+        return removed
+
+    # -------------------------------
+    # Items whose AR delay has passed (oldest first)
+    # -------------------------------
+    def peek_ready(self, now_ms, delay):
+        """Oldest queued item with now_ms - time_ms >= delay, or None. O(1)."""
+        if self.queue and now_ms - self.queue[0].time_ms >= delay:
+            return self.queue[0]
+        return None
+
+    def pop_ready(self, now_ms, delay):
+        """Remove and return every item with now_ms - time_ms >= delay, oldest first."""
+        cut = bisect.bisect_right(self._queue_keys, (now_ms - delay, math.inf))
+        if cut == 0:
+            return []
+        ready = self.queue[:cut]
+        del self.queue[:cut]
+        del self._queue_keys[:cut]
+        for item in ready:
+            del self._queue_order[id(item)]
+            self._queue_grid.remove(item.x, item.y, item)
+        return ready
 
     def __len__(self):
         return len(self.queue)
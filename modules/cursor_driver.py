@@ -0,0 +1,133 @@
+import math
+import threading
+
+from .config import CURSOR_RATE_HZ
+from .metrics import metrics as shared_metrics
+from .scheduler import Scheduler
+
+
+class CursorDriver(threading.Thread):
+    """
+    Moves the cursor for the running slider / spinner at a fixed rate on
+    its own thread, independent of capture / inference / matching.
+
+    Each tick evaluates action.position(t) for the current map time
+    (time_fn(), seconds), moves the cursor only when the position changed
+    and presses / releases the button on changes. When the action reports
+    the button up it is marked done and on_done() is called. Ticks are
+    timed by a Scheduler (sleep, then spin) and only run while an action
+    is active; stats() gives the achieved rate and interval jitter.
+
+    mouse provides set_cursor / mouse_leftdown / mouse_leftup
+    (modules.osu_input by default).
+    """
+    def __init__(self, time_fn, rate_hz=CURSOR_RATE_HZ, mouse=None, on_done=None, metrics=None):
+        super().__init__(name="cursor", daemon=True)
+        if mouse is None:
+            from . import osu_input as mouse
+        self.time_fn = time_fn
+        self.period_ms = 1000.0 / rate_hz
+        self.mouse = mouse
+        self.on_done = on_done
+        metrics = metrics or shared_metrics
+        self.scheduler = Scheduler(metrics=metrics)
+        self._h_interval = metrics.histogram("cursor_interval")
+
+        self._lock = threading.Lock()  # run_action (matcher thread) vs _finish (driver thread)
+        self._action = None
+        self._tick_event = None
+        self._last_pos = None
+        self._down = False
+
+        # achieved rate / jitter (Welford over tick intervals)
+        self.ticks = 0
+        self._busy_ms = 0.0
+        self._last_tick = None
+        self._mean = 0.0
+        self._m2 = 0.0
+
+    def run_action(self, action):
+        """Start driving action (anything with position(t) and done); replaces the current one."""
+        with self._lock:
+            self._last_tick = None
+            self._last_pos = None  # the cursor may have been moved by a circle click since
+            self._action = action
+            self.scheduler.cancel(self._tick_event)
+            self._tick_event = self.scheduler.call_every(self.period_ms, self._tick, "cursor",
+                                                         first_ms=self.scheduler.clock())
+
+    def _finish(self, action):
+        # only clear our state if run_action hasn't moved on; done goes last,
+        # since the matcher may start the next action as soon as it sees it
+        with self._lock:
+            if self._action is action:
+                self._action = None
+                self.scheduler.cancel(self._tick_event)
+                self._tick_event = None
+        action.done = True
+        if self.on_done is not None:
+            self.on_done()
+
+    def _tick(self):
+        now = self.scheduler.clock()
+        if self._last_tick is not None:
+            interval = now - self._last_tick
+            self._h_interval.record(interval)
+            self.ticks += 1
+            self._busy_ms += interval
+            delta = interval - self._mean
+            self._mean += delta / self.ticks
+            self._m2 += delta * (interval - self._mean)
+        self._last_tick = now
+
+        action = self._action
+        if action is None or action.done:
+            return
+        x, y, down = action.position(self.time_fn())
+        if (x, y) != self._last_pos:
+            self.mouse.set_cursor(x, y)
+            self._last_pos = (x, y)
+        if down != self._down:
+            if down:
+                self.mouse.mouse_leftdown()
+            else:
+                self.mouse.mouse_leftup()
+            self._down = down
+        if not down:
+            self._finish(action)
+
+    def run(self):
+        self.scheduler.run()
+
+    def stop(self):
+        self.scheduler.stop()
+
+    def stats(self):
+        return {
+            "target_hz": round(1000.0 / self.period_ms, 1),
+            "rate_hz": round(self.ticks / self._busy_ms * 1000, 1) if self._busy_ms else 0.0,
+            "jitter_ms": round(math.sqrt(self._m2 / self.ticks), 4) if self.ticks > 1 else 0.0,
+            "ticks": self.ticks,
+        }
+
+
+class DrivenAction:
+    """
+    Matcher-side handle for an action run by a CursorDriver: creating it
+    starts the driver, update() does nothing (the driver owns the mouse)
+    and done flips when the driver finishes the action.
+    """
+    driven = True
+
+    def __init__(self, action, driver):
+        self.action = action
+        self.obj = action.obj
+        self.end_t = action.end_t
+        driver.run_action(action)
+
+    @property
+    def done(self):
+        return self.action.done
+
+    def update(self, t):
+        pass
@@ -0,0 +1,209 @@
+import ast
+import os
+import time
+
+import cv2
+import numpy as np
+
+from .config import (DETECTOR_BACKEND, ONNX_MODEL_PATH, ONNX_THREADS, ONNX_INPUT_SIZE,
+                     ONNX_CONF_THRESHOLD, ONNX_IOU_THRESHOLD, DETECTOR_WARMUP_RUNS)
+from .coord_queue import DetectionBatch, class_id
+
+
+class Detector:
+    """
+    Object detector interface. infer(image) takes a BGR image and returns a
+    DetectionBatch in that image's pixel coordinates (time_ms 0, restamp it
+    with the capture time). infer_batch runs several frames at once where the
+    backend supports it, warmup() pays one-off costs before the map starts.
+    """
+    input_size = None  # (width, height) the model runs at, None if it doesn't care
+
+    def infer(self, image):
+        raise NotImplementedError
+
+    def infer_batch(self, images):
+        return [self.infer(image) for image in images]
+
+    def warmup(self, runs=DETECTOR_WARMUP_RUNS):
+        """Run the model on blank frames, returns the time of each run in ms."""
+        w, h = self.input_size or (640, 640)
+        blank = np.zeros((h, w, 3), dtype=np.uint8)
+        timings = []
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            self.infer(blank)
+            timings.append((time.perf_counter() - t0) * 1000)
+        return timings
+
+    def close(self):
+        pass
+
+
+# -------------------------------
+# Roboflow inference (inference.get_model)
+# -------------------------------
+class RoboflowDetector(Detector):
+    """Adapter for the hosted model loaded through inference.get_model."""
+    def __init__(self, model_id, api_key):
+        from inference import get_model
+        self.model = get_model(model_id=model_id, api_key=api_key)
+
+    def infer(self, image):
+        results = self.model.infer(image)
+        return DetectionBatch.from_predictions(results[0].predictions, image.shape, 0)
+
+    def infer_batch(self, images):
+        results = self.model.infer(list(images))
+        return [DetectionBatch.from_predictions(r.predictions, image.shape, 0)
+                for r, image in zip(results, images)]
+
+
+# -------------------------------
+# ONNX Runtime on CPU
+# -------------------------------
+class OnnxDetector(Detector):
+    """
+    YOLO-style ONNX model on ONNX Runtime's CPU provider.
+
+    Images are letterboxed to the model's input size into a preallocated
+    NCHW blob, so the model sees the same aspect ratio at any capture size.
+    Outputs in YOLOv8 (1, 4 + classes, boxes) or YOLOv5 (1, boxes,
+    5 + classes) layout are decoded, filtered by conf_threshold, run
+    through NMS and mapped back to the original image.
+    """
+    def __init__(self, model_path=ONNX_MODEL_PATH, threads=ONNX_THREADS, input_size=ONNX_INPUT_SIZE,
+                 class_names=None, conf_threshold=ONNX_CONF_THRESHOLD, iou_threshold=ONNX_IOU_THRESHOLD):
+        import onnxruntime as ort
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_path, sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        self.conf_threshold = conf_threshold
+        self.iou_threshold = iou_threshold
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        batch_dim, _, in_h, in_w = model_input.shape
+        if input_size is None:
+            input_size = (int(in_w), int(in_h))
+        self.input_size = tuple(input_size)
+        # exported with a fixed batch of 1 unless the batch dimension is symbolic
+        self.dynamic_batch = not isinstance(batch_dim, int)
+
+        if class_names is None:
+            class_names = self._names_from_metadata()
+        self.class_names = list(class_names)
+        self._class_ids = np.array([class_id(name) for name in self.class_names], dtype=np.int16)
+
+        w, h = self.input_size
+        self._blob = np.empty((1, 3, h, w), dtype=np.float32)
+        self._resized = np.empty((h, w, 3), dtype=np.uint8)
+
+    def _names_from_metadata(self):
+        # ultralytics / roboflow exports store {0: 'circle', ...} as a string
+        names = self.session.get_modelmeta().custom_metadata_map.get("names")
+        if names is None:
+            raise ValueError("model has no 'names' metadata, pass class_names")
+        names = ast.literal_eval(names)
+        return [names[i] for i in sorted(names)] if isinstance(names, dict) else list(names)
+
+    def _letterbox(self, image, out):
+        """Resize image into out (CHW float32) keeping aspect ratio, returns (scale, pad_x, pad_y)."""
+        w, h = self.input_size
+        img_h, img_w = image.shape[:2]
+        scale = min(w / img_w, h / img_h)
+        new_w, new_h = int(round(img_w * scale)), int(round(img_h * scale))
+        pad_x, pad_y = (w - new_w) // 2, (h - new_h) // 2
+
+        self._resized[:] = 114
+        cv2.resize(image, (new_w, new_h), dst=self._resized[pad_y:pad_y + new_h, pad_x:pad_x + new_w],
+                   interpolation=cv2.INTER_LINEAR)
+        # BGR HWC uint8 -> RGB CHW float 0..1
+        for c in range(3):
+            np.multiply(self._resized[:, :, 2 - c], 1 / 255.0, out=out[c], casting="unsafe")
+        return scale, pad_x, pad_y
+
+    def _decode(self, output, image_shape, scale, pad_x, pad_y):
+        n_classes = len(self.class_names)
+        if output.shape[0] == 4 + n_classes and output.shape[0] < output.shape[1]:
+            output = output.T  # YOLOv8: (4 + classes, boxes)
+            scores = output[:, 4:]
+        else:
+            scores = output[:, 5:] * output[:, 4:5]  # YOLOv5: objectness * class score
+        cls = scores.argmax(axis=1)
+        conf = scores[np.arange(len(scores)), cls]
+        keep = conf >= self.conf_threshold
+        boxes, cls, conf = output[keep, :4], cls[keep], conf[keep]
+
+        if len(boxes):
+            xywh = np.column_stack((boxes[:, 0] - boxes[:, 2] / 2, boxes[:, 1] - boxes[:, 3] / 2,
+                                    boxes[:, 2], boxes[:, 3]))
+            idx = cv2.dnn.NMSBoxesBatched(xywh.tolist(), conf.tolist(), cls.tolist(),
+                                          self.conf_threshold, self.iou_threshold)
+            idx = np.asarray(idx, dtype=np.int64).reshape(-1)
+            boxes, cls, conf = boxes[idx], cls[idx], conf[idx]
+
+        n = len(boxes)
+        return DetectionBatch(self._class_ids[cls], conf.astype(np.float64),
+                              (boxes[:, 0] - pad_x) / scale, (boxes[:, 1] - pad_y) / scale,
+                              boxes[:, 2] / scale, boxes[:, 3] / scale,
+                              np.zeros(n, dtype=np.int64), int(image_shape[1]), int(image_shape[0]))
+
+    def infer(self, image):
+        letterbox = self._letterbox(image, self._blob[0])
+        output = self.session.run(None, {self.input_name: self._blob})[0]
+        return self._decode(output[0], image.shape, *letterbox)
+
+    def infer_batch(self, images):
+        if not self.dynamic_batch or len(images) < 2:
+            return [self.infer(image) for image in images]
+        w, h = self.input_size
+        blob = np.empty((len(images), 3, h, w), dtype=np.float32)
+        letterboxes = [self._letterbox(image, blob[i]) for i, image in enumerate(images)]
+        outputs = self.session.run(None, {self.input_name: blob})[0]
+        return [self._decode(outputs[i], image.shape, *letterboxes[i]) for i, image in enumerate(images)]
+
+
+# -------------------------------
+# Stub for tests / offline runs
+# -------------------------------
+class StubDetector(Detector):
+    """
+    Returns canned detections without a model. detections is either a
+    function image -> DetectionBatch or a list of batches returned in turn
+    (empty batches once it runs out). latency_ms simulates inference time.
+    """
+    def __init__(self, detections=None, latency_ms=0.0, input_size=None):
+        self.detections = detections
+        self.latency_ms = latency_ms
+        self.input_size = input_size
+        self.calls = 0
+
+    def infer(self, image):
+        self.calls += 1
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if callable(self.detections):
+            return self.detections(image)
+        if self.detections:
+            return self.detections.pop(0)
+        return DetectionBatch.empty(image.shape)
+
+
+def create_detector(backend=None, **kwargs):
+    """Detector for backend ("roboflow", "onnx", "stub"); defaults to $DETECTOR_BACKEND."""
+    backend = backend or os.getenv("DETECTOR_BACKEND", DETECTOR_BACKEND)
+    if backend == "roboflow":
+        kwargs.setdefault("model_id", os.getenv("MODEL_ID"))
+        kwargs.setdefault("api_key", os.getenv("API_KEY"))
+        return RoboflowDetector(**kwargs)
+    if backend == "onnx":
+        kwargs.setdefault("model_path", os.getenv("ONNX_MODEL_PATH", ONNX_MODEL_PATH))
+        return OnnxDetector(**kwargs)
+    if backend == "stub":
+        return StubDetector(**kwargs)
+    raise ValueError(f"unknown detector backend {backend!r}")
@@ -0,0 +1,168 @@
+import cv2
+import numpy as np
+
+from .config import FRAME_CROP_PLAYFIELD, FRAME_CROP_MARGIN, FRAME_TARGET_SIZE, FRAME_POOL_SIZE
+from .config import FRAME_GATE_SIZE, FRAME_GATE_THRESHOLD, FRAME_GATE_MAX_SKIP_MS
+
+
+class FrameMapping:
+    """How a model image relates to the full captured frame: frame = offset + image / scale."""
+    __slots__ = ("offset_x", "offset_y", "scale_x", "scale_y", "frame_w", "frame_h")
+
+    def __init__(self, offset_x, offset_y, scale_x, scale_y, frame_w, frame_h):
+        self.offset_x = offset_x
+        self.offset_y = offset_y
+        self.scale_x = scale_x
+        self.scale_y = scale_y
+        self.frame_w = frame_w
+        self.frame_h = frame_h
+
+
+class FramePreprocessor:
+    """
+    BGRA frame -> BGR model input without per-frame allocations.
+
+    The frame is cropped (as a view) to the playfield plus a margin, then
+    optionally resized to the model's input size, into a small pool of
+    preallocated buffers used round-robin (so a frame still being shown
+    in the preview isn't overwritten by the next one). Returns
+    (image, FrameMapping) so detections can be mapped back to full-frame
+    coordinates. The captured frame is the window's client area, so a
+    change in frame size means the window was resized: the playfield's
+    cached client rect is invalidated before the crop is recomputed.
+    """
+    def __init__(self, playfield=None, crop_playfield=FRAME_CROP_PLAYFIELD, margin=FRAME_CROP_MARGIN,
+                 target_size=FRAME_TARGET_SIZE, pool_size=FRAME_POOL_SIZE):
+        self.playfield = playfield
+        self.crop_playfield = crop_playfield and playfield is not None
+        self.margin = margin
+        self.target_size = target_size  # (width, height) or None
+        self.pool_size = pool_size
+
+        self._frame_size = None
+        self._geometry_key = None
+        self._crop = None
+        self._mapping = None
+        self._bgra_pool = []
+        self._bgr_pool = []
+        self._next = 0
+
+    def _crop_rect(self, frame_w, frame_h):
+        if not self.crop_playfield:
+            return 0, 0, frame_w, frame_h
+        geometry = self.playfield.geometry()  # one snapshot, in case the window moves meanwhile
+        left, top, right, bottom = geometry.rect
+        client_w, client_h = right - left, bottom - top
+        px0, py0, px1, py1 = geometry.playfield_rect
+        pad = self.margin * (py1 - py0)
+
+        # client coords -> frame pixels (frame is the client area, maybe scaled)
+        sx, sy = frame_w / client_w, frame_h / client_h
+        x0 = max(0, int((px0 - pad) * sx))
+        y0 = max(0, int((py0 - pad) * sy))
+        x1 = min(frame_w, int(np.ceil((px1 + pad) * sx)))
+        y1 = min(frame_h, int(np.ceil((py1 + pad) * sy)))
+        return x0, y0, x1, y1
+
+    def _prepare(self, frame_w, frame_h):
+        crop = self._crop_rect(frame_w, frame_h)
+        key = (frame_w, frame_h, crop)
+        if key == self._geometry_key:
+            return
+        x0, y0, x1, y1 = crop
+        crop_w, crop_h = x1 - x0, y1 - y0
+        out_w, out_h = self.target_size or (crop_w, crop_h)
+
+        self._bgr_pool = [np.empty((out_h, out_w, 3), dtype=np.uint8) for _ in range(self.pool_size)]
+        self._bgra_pool = ([np.empty((out_h, out_w, 4), dtype=np.uint8) for _ in range(self.pool_size)]
+                           if self.target_size else [])
+        self._crop = crop
+        self._mapping = FrameMapping(x0, y0, out_w / crop_w, out_h / crop_h, frame_w, frame_h)
+        self._geometry_key = key
+
+    def process(self, buf):
+        """buf: (H, W, 4) BGRA array. Returns (bgr_image, FrameMapping)."""
+        frame_h, frame_w = buf.shape[:2]
+        if (frame_w, frame_h) != self._frame_size:
+            if self._frame_size is not None and self.playfield is not None:
+                self.playfield.invalidate()
+            self._frame_size = (frame_w, frame_h)
+        self._prepare(frame_w, frame_h)
+        x0, y0, x1, y1 = self._crop
+        roi = buf[y0:y1, x0:x1]
+
+        i = self._next
+        self._next = (i + 1) % self.pool_size
+        out = self._bgr_pool[i]
+        if self.target_size:
+            small = self._bgra_pool[i]
+            cv2.resize(roi, self.target_size, dst=small, interpolation=cv2.INTER_AREA)
+            cv2.cvtColor(small, cv2.COLOR_BGRA2BGR, dst=out)
+        else:
+            cv2.cvtColor(roi, cv2.COLOR_BGRA2BGR, dst=out)
+        return out, self._mapping
+
+    def __call__(self, frame):
+        return self.process(frame.frame_buffer)
+
+
+class FrameChangeGate:
+    """
+    Decides whether a frame is worth running the model on. A frame is
+    skipped when it has the same sequence number as the last one, or when
+    no cell of its downsampled grey thumbnail differs from the last
+    inferred frame by threshold or more, as long as the last inference is
+    younger than max_skip_ms. The max over cells (not the mean) is used so
+    a single new circle on an otherwise static frame always counts.
+    Counters show how much inference was saved.
+    """
+    def __init__(self, size=FRAME_GATE_SIZE, threshold=FRAME_GATE_THRESHOLD, max_skip_ms=FRAME_GATE_MAX_SKIP_MS):
+        self.size = size
+        self.threshold = threshold
+        self.max_skip_ms = max_skip_ms
+
+        w, h = size
+        self._small = np.empty((h, w, 3), dtype=np.uint8)
+        self._grey = np.empty((h, w), dtype=np.uint8)
+        self._reference = np.empty((h, w), dtype=np.uint8)
+        self._diff = np.empty((h, w), dtype=np.uint8)
+        self._has_reference = False
+        self._last_seq = None
+        self._last_infer_ms = None
+
+        self.frames = 0
+        self.inferred = 0
+        self.skipped_same_seq = 0
+        self.skipped_unchanged = 0
+        self.last_change = 0.0
+
+    def should_infer(self, image, now_ms, seq=None):
+        self.frames += 1
+        if seq is not None and seq == self._last_seq:
+            self.skipped_same_seq += 1
+            return False
+        self._last_seq = seq
+
+        cv2.resize(image, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._grey)
+        if self._has_reference:
+            cv2.absdiff(self._grey, self._reference, dst=self._diff)
+            self.last_change = float(cv2.minMaxLoc(self._diff)[1])
+            stale = now_ms - self._last_infer_ms >= self.max_skip_ms
+            if self.last_change < self.threshold and not stale:
+                self.skipped_unchanged += 1
+                return False
+
+        self._reference[:] = self._grey
+        self._has_reference = True
+        self._last_infer_ms = now_ms
+        self.inferred += 1
+        return True
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "inferred": self.inferred,
+            "skipped_same_seq": self.skipped_same_seq,
+            "skipped_unchanged": self.skipped_unchanged,
+        }
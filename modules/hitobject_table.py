@@ -0,0 +1,187 @@
+import numpy as np
+
+from .read_map import HitCircle, Slider, Spinner
+
+# object kinds (same bits as the .osu type field)
+KIND_CIRCLE = 1
+KIND_SLIDER = 2
+KIND_SPINNER = 8
+
+
+def _offsets(lengths):
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+class HitObjectTable:
+    """
+    Structure-of-arrays storage for a beatmap's hit objects.
+
+    Every object is one row of the scalar columns (x, y, time, type,
+    end_time, duration_ms, ...). Slider control points, edge sounds and
+    edge sets live in flat arrays indexed by per-row offsets.
+    table[i] still returns a HitCircle / Slider / Spinner.
+    """
+    # every column except extras (which holds python strings), in __init__ order
+    ARRAY_COLUMNS = ("x", "y", "time", "type", "hit_sound", "kind", "end_time", "duration_ms",
+                     "slides", "length", "curve_type", "point_offsets", "points",
+                     "edge_sound_offsets", "edge_sounds", "edge_set_offsets", "edge_sets")
+
+    def __init__(self, x, y, time, type_, hit_sound, kind, end_time, duration_ms,
+                 slides, length, curve_type, point_offsets, points,
+                 edge_sound_offsets, edge_sounds, edge_set_offsets, edge_sets, extras):
+        self.x = x
+        self.y = y
+        self.time = time
+        self.type = type_
+        self.hit_sound = hit_sound
+        self.kind = kind
+        self.end_time = end_time
+        self.duration_ms = duration_ms
+        self.slides = slides
+        self.length = length
+        self.curve_type = curve_type
+        self.point_offsets = point_offsets
+        self.points = points
+        self.edge_sound_offsets = edge_sound_offsets
+        self.edge_sounds = edge_sounds
+        self.edge_set_offsets = edge_set_offsets
+        self.edge_sets = edge_sets
+        self.extras = extras
+
+    @classmethod
+    def from_objects(cls, hitobjects):
+        objs = [obj for obj in hitobjects if obj is not None]
+        n = len(objs)
+
+        x = np.fromiter((o.x for o in objs), dtype=np.int32, count=n)
+        y = np.fromiter((o.y for o in objs), dtype=np.int32, count=n)
+        time = np.fromiter((o.time for o in objs), dtype=np.int64, count=n)
+        type_ = np.fromiter((o.type for o in objs), dtype=np.int32, count=n)
+        hit_sound = np.fromiter((o.hitSound for o in objs), dtype=np.int32, count=n)
+        kind = np.zeros(n, dtype=np.int8)
+        end_time = time.copy()
+        duration_ms = np.zeros(n, dtype=np.float64)
+        slides = np.zeros(n, dtype=np.int32)
+        length = np.zeros(n, dtype=np.float64)
+        curve_type = np.full(n, "", dtype="<U1")
+        extras = np.full(n, "", dtype=object)
+
+        point_lists = []
+        edge_sound_lists = []
+        edge_set_lists = []
+        for i, obj in enumerate(objs):
+            if isinstance(obj, Slider):
+                kind[i] = KIND_SLIDER
+                slides[i] = obj.slides
+                length[i] = obj.length
+                curve_type[i] = obj.curveType
+                extras[i] = obj.extras
+                if obj.duration_ms is not None:
+                    duration_ms[i] = obj.duration_ms
+                    end_time[i] = obj.end_time
+                else:
+                    duration_ms[i] = np.nan  # timings not computed yet
+                point_lists.append(obj.points)
+                edge_sound_lists.append(obj.edgeSounds)
+                edge_set_lists.append(obj.edgeSets)
+                continue
+
+            if isinstance(obj, Spinner):
+                kind[i] = KIND_SPINNER
+                end_time[i] = obj.endTime
+                duration_ms[i] = obj.endTime - obj.time
+                extras[i] = obj.additions
+            else:
+                kind[i] = KIND_CIRCLE
+            point_lists.append(())
+            edge_sound_lists.append(())
+            edge_set_lists.append(())
+
+        points = np.array([p for pts in point_lists for p in pts], dtype=np.int32).reshape(-1, 2)
+        edge_sounds = np.array([s for es in edge_sound_lists for s in es], dtype=np.int32)
+        edge_sets = np.array([s for es in edge_set_lists for s in es], dtype=np.int32).reshape(-1, 2)
+
+        return cls(x, y, time, type_, hit_sound, kind, end_time, duration_ms,
+                   slides, length, curve_type,
+                   _offsets([len(p) for p in point_lists]), points,
+                   _offsets([len(s) for s in edge_sound_lists]), edge_sounds,
+                   _offsets([len(s) for s in edge_set_lists]), edge_sets, extras)
+
+    def __len__(self):
+        return len(self.time)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+
+        kind = self.kind[i]
+        x, y, time = int(self.x[i]), int(self.y[i]), int(self.time[i])
+        type_, hit_sound = int(self.type[i]), int(self.hit_sound[i])
+
+        if kind == KIND_SLIDER:
+            duration_ms = float(self.duration_ms[i])
+            timed = not np.isnan(duration_ms)
+            return Slider(x, y, time, type_, hit_sound,
+                          str(self.curve_type[i]), self.slider_points(i),
+                          int(self.slides[i]), float(self.length[i]),
+                          self._slice(self.edge_sound_offsets, self.edge_sounds, i).tolist(),
+                          [tuple(es) for es in self._slice(self.edge_set_offsets, self.edge_sets, i).tolist()],
+                          self.extras[i],
+                          duration_ms=duration_ms if timed else None,
+                          end_time=int(self.end_time[i]) if timed else None)
+        if kind == KIND_SPINNER:
+            return Spinner(x, y, time, type_, hit_sound, int(self.end_time[i]), self.extras[i])
+        return HitCircle(x, y, time, type_, hit_sound)
+
+    @staticmethod
+    def _slice(offsets, values, i):
+        return values[offsets[i]:offsets[i + 1]]
+
+    def slider_points(self, i):
+        """Control points of row i (excluding the head) as a list of tuples."""
+        return [tuple(p) for p in self._slice(self.point_offsets, self.points, i).tolist()]
+
+    def slider_points_array(self, i):
+        """Control points of row i as a (k, 2) view into the flat array."""
+        return self._slice(self.point_offsets, self.points, i)
+
+    # -------------------------------
+    # Whole-map queries
+    # -------------------------------
+    @property
+    def slider_mask(self):
+        return self.kind == KIND_SLIDER
+
+    @property
+    def spinner_mask(self):
+        return self.kind == KIND_SPINNER
+
+    @property
+    def circle_mask(self):
+        return self.kind == KIND_CIRCLE
+
+    def counts(self):
+        """Return (circles, sliders, spinners)."""
+        return (int(self.circle_mask.sum()), int(self.slider_mask.sum()), int(self.spinner_mask.sum()))
+
+    def density(self, window_ms=1000):
+        """Number of objects starting in the window_ms before (and including) each object."""
+        starts = np.searchsorted(self.time, self.time - window_ms, side="right")
+        return np.arange(len(self)) - starts + 1
+
+    def compute_slider_timings(self, timing_index, slider_multiplier):
+        """Fill duration_ms / end_time of every slider row in one pass (see TimingIndex.slider_timings)."""
+        mask = self.slider_mask
+        duration_ms, end_time = timing_index.slider_timings(
+            self.time[mask], self.length[mask], self.slides[mask], slider_multiplier)
+        self.duration_ms[mask] = duration_ms
+        self.end_time[mask] = end_time
+        return self
@@ -0,0 +1,42 @@
+import ctypes
+import threading
+import time
+
+from .config import KEY_POLL_INTERVAL
+
+VK_KEYS = {"f": 0x46, "q": 0x51}
+
+
+class KeyPoller(threading.Thread):
+    """
+    Polls GetAsyncKeyState on its own thread and remembers presses, so the
+    main loop only checks a flag instead of blocking in cv2.waitKey.
+    """
+    def __init__(self, keys=VK_KEYS, interval=KEY_POLL_INTERVAL):
+        super().__init__(name="keys", daemon=True)
+        self.keys = dict(keys)
+        self.interval = interval
+        self._pressed = {name: threading.Event() for name in self.keys}
+        self._stop_event = threading.Event()
+        self._get_key_state = ctypes.windll.user32.GetAsyncKeyState
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        was_down = {name: False for name in self.keys}
+        while not self._stop_event.is_set():
+            for name, vk in self.keys.items():
+                down = bool(self._get_key_state(vk) & 0x8000)
+                if down and not was_down[name]:
+                    self._pressed[name].set()
+                was_down[name] = down
+            time.sleep(self.interval)
+
+    def consume(self, name):
+        """True once per press of key name since the last call."""
+        event = self._pressed[name]
+        if event.is_set():
+            event.clear()
+            return True
+        return False
@@ -0,0 +1,260 @@
+import hashlib
+import os
+import sqlite3
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from .config import LIBRARY_DB_PATH
+from .read_map import PARSER_VERSION, OsuReader, Slider, Spinner, prep_osu_objects
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS beatmaps (
+    path             TEXT PRIMARY KEY,
+    mtime            REAL NOT NULL,
+    size             INTEGER NOT NULL,
+    hash             TEXT NOT NULL,
+    parser_version   INTEGER NOT NULL,
+    title            TEXT,
+    artist           TEXT,
+    creator          TEXT,
+    version          TEXT,
+    beatmap_id       INTEGER,
+    beatmapset_id    INTEGER,
+    mode             INTEGER,
+    hp               REAL,
+    cs               REAL,
+    od               REAL,
+    ar               REAL,
+    slider_multiplier REAL,
+    circles          INTEGER,
+    sliders          INTEGER,
+    spinners         INTEGER,
+    unknown_objects  INTEGER,
+    start_ms         INTEGER,
+    end_ms           INTEGER,
+    duration_ms      INTEGER,
+    ar_delay         REAL,
+    time_delay_300   REAL,
+    error            TEXT,
+    indexed_at       REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS beatmaps_hash ON beatmaps(hash);
+CREATE INDEX IF NOT EXISTS beatmaps_title ON beatmaps(title, artist, version);
+"""
+
+COLUMNS = ("path", "mtime", "size", "hash", "parser_version", "title", "artist", "creator",
+           "version", "beatmap_id", "beatmapset_id", "mode", "hp", "cs", "od", "ar",
+           "slider_multiplier", "circles", "sliders", "spinners", "unknown_objects", "start_ms", "end_ms",
+           "duration_ms", "ar_delay", "time_delay_300", "error", "indexed_at")
+
+
+def file_hash(path):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _to_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _object_end(obj):
+    if isinstance(obj, Slider):
+        return obj.end_time
+    if isinstance(obj, Spinner):
+        return obj.endTime
+    return obj.time
+
+
+def index_file(path, content_hash=None):
+    """
+    Parse one .osu and return a catalog row (dict). Runs in worker processes,
+    so it must stay a module-level function. Any failure, including the file
+    vanishing or being unreadable, is recorded in the row's error column
+    instead of raised, so one bad file can't abort a whole update().
+    content_hash is the file_hash() update() already computed, if any. The
+    file is indexed by a single OsuReader, and hit objects of unknown type
+    are counted in unknown_objects rather than printed.
+    """
+    row = dict.fromkeys(COLUMNS)
+    # placeholders until stat / hash succeed; they never match, so a failed file is retried next update
+    row.update(path=path, mtime=0.0, size=-1, hash="", parser_version=PARSER_VERSION, indexed_at=time.time())
+    try:
+        stat = os.stat(path)
+        row.update(mtime=stat.st_mtime, size=stat.st_size, hash=content_hash or file_hash(path))
+        reader = OsuReader(path, warn_unknown=False)
+        general = reader.read_key_values("[General]")
+        metadata = reader.read_key_values("[Metadata]")
+        difficulty = reader.read_difficulty()
+        hitobjects, _, slider_multiplier, time_delay_300, AR_delay = prep_osu_objects(reader)
+    except Exception as e:
+        row["error"] = f"{type(e).__name__}: {e}"
+        return row
+
+    hitobjects = [obj for obj in hitobjects if obj is not None]
+    row.update(
+        title=metadata.get("Title"),
+        artist=metadata.get("Artist"),
+        creator=metadata.get("Creator"),
+        version=metadata.get("Version"),
+        beatmap_id=_to_int(metadata.get("BeatmapID")),
+        beatmapset_id=_to_int(metadata.get("BeatmapSetID")),
+        mode=_to_int(general.get("Mode", 0)),
+        hp=difficulty.get("HPDrainRate"),
+        cs=difficulty.get("CircleSize"),
+        od=difficulty.get("OverallDifficulty"),
+        ar=difficulty.get("ApproachRate", difficulty.get("OverallDifficulty")),
+        slider_multiplier=slider_multiplier,
+        circles=sum(1 for obj in hitobjects if not isinstance(obj, (Slider, Spinner))),
+        sliders=sum(1 for obj in hitobjects if isinstance(obj, Slider)),
+        spinners=sum(1 for obj in hitobjects if isinstance(obj, Spinner)),
+        unknown_objects=reader.unknown_objects,
+        ar_delay=AR_delay,
+        time_delay_300=time_delay_300,
+    )
+    if hitobjects:
+        row["start_ms"] = hitobjects[0].time
+        row["end_ms"] = max(_object_end(obj) for obj in hitobjects)
+        row["duration_ms"] = row["end_ms"] - row["start_ms"]
+    return row
+
+
+class LibraryIndex:
+    """
+    SQLite catalog of a beatmap library (e.g. an osu! Songs folder).
+
+    update() walks a directory tree and (re)parses only files whose
+    mtime/size changed and whose content hash differs from the catalog,
+    spreading the parsing over a process pool. Picking a map is then a
+    query instead of a parse.
+    """
+    def __init__(self, db_path=LIBRARY_DB_PATH):
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def close(self):
+        self.conn.close()
+
+    def _migrate(self):
+        columns = {r["name"] for r in self.conn.execute("PRAGMA table_info(beatmaps)")}
+        if "unknown_objects" not in columns:
+            # catalogs from before the column existed: add it and re-parse every row on the next update()
+            self.conn.execute("ALTER TABLE beatmaps ADD COLUMN unknown_objects INTEGER")
+            self.conn.execute("UPDATE beatmaps SET parser_version = -1")
+            self.conn.commit()
+
+    # -------------------------------
+    # Indexing
+    # -------------------------------
+    def _known(self):
+        rows = self.conn.execute("SELECT path, mtime, size, hash, parser_version FROM beatmaps")
+        return {r["path"]: r for r in rows}
+
+    def update(self, root, workers=None, chunksize=8):
+        """
+        Index every .osu under root. Returns (parsed, skipped, removed).
+        """
+        known = self._known()
+        seen = set()
+        to_parse = []
+        hashes = []  # file_hash() of each to_parse entry when already computed here
+        skipped = 0
+
+        for dirpath, _, filenames in os.walk(root):
+            for name in filenames:
+                if not name.lower().endswith(".osu"):
+                    continue
+                path = os.path.abspath(os.path.join(dirpath, name))
+                seen.add(path)
+                row = known.get(path)
+                if row is None or row["parser_version"] != PARSER_VERSION:
+                    to_parse.append(path)
+                    hashes.append(None)
+                    continue
+
+                try:
+                    stat = os.stat(path)
+                    if row["mtime"] == stat.st_mtime and row["size"] == stat.st_size:
+                        skipped += 1
+                        continue
+                    # touched but maybe not changed: compare contents before re-parsing
+                    content_hash = file_hash(path)
+                    unchanged = row["hash"] == content_hash
+                except OSError:
+                    # gone / unreadable since the walk: index_file records the error
+                    to_parse.append(path)
+                    hashes.append(None)
+                    continue
+                if unchanged:
+                    self.conn.execute("UPDATE beatmaps SET mtime = ?, size = ? WHERE path = ?",
+                                      (stat.st_mtime, stat.st_size, path))
+                    skipped += 1
+                    continue
+                to_parse.append(path)
+                hashes.append(content_hash)
+
+        parsed = 0
+        if to_parse:
+            insert = (f"INSERT OR REPLACE INTO beatmaps ({', '.join(COLUMNS)}) "
+                      f"VALUES ({', '.join('?' * len(COLUMNS))})")
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for row in pool.map(index_file, to_parse, hashes, chunksize=chunksize):
+                    self.conn.execute(insert, [row[c] for c in COLUMNS])
+                    parsed += 1
+
+        # drop catalog entries under root whose file is gone
+        prefix = os.path.join(os.path.abspath(root), "")
+        removed = [p for p in known if p.startswith(prefix) and p not in seen]
+        self.conn.executemany("DELETE FROM beatmaps WHERE path = ?", [(p,) for p in removed])
+
+        self.conn.commit()
+        return parsed, skipped, len(removed)
+
+    # -------------------------------
+    # Queries
+    # -------------------------------
+    def get(self, path):
+        return self.conn.execute("SELECT * FROM beatmaps WHERE path = ?",
+                                 (os.path.abspath(path),)).fetchone()
+
+    def find(self, title=None, artist=None, version=None, mode=None,
+             min_ar=None, max_ar=None, min_od=None, max_od=None, limit=100):
+        """Search the catalog; text filters are case-insensitive substring matches."""
+        where = ["error IS NULL"]
+        args = []
+        for column, value in (("title", title), ("artist", artist), ("version", version)):
+            if value is not None:
+                where.append(f"{column} LIKE ?")
+                args.append(f"%{value}%")
+        for clause, value in (("mode = ?", mode), ("ar >= ?", min_ar), ("ar <= ?", max_ar),
+                              ("od >= ?", min_od), ("od <= ?", max_od)):
+            if value is not None:
+                where.append(clause)
+                args.append(value)
+        args.append(limit)
+        query = f"SELECT * FROM beatmaps WHERE {' AND '.join(where)} ORDER BY artist, title, version LIMIT ?"
+        return self.conn.execute(query, args).fetchall()
+
+    def __len__(self):
+        return self.conn.execute("SELECT COUNT(*) FROM beatmaps").fetchone()[0]
+
+
+if __name__ == "__main__":
+    # python -m modules.library_index <Songs folder>
+    import sys
+
+    songs_dir = sys.argv[1] if len(sys.argv) > 1 else "./test_songs"
+    library = LibraryIndex()
+    start = time.perf_counter()
+    parsed, skipped, removed = library.update(songs_dir)
+    print(f"Indexed {songs_dir}: {parsed} parsed, {skipped} unchanged, {removed} removed "
+          f"in {time.perf_counter() - start:.2f}s ({len(library)} maps in catalog)")
+    library.close()
@@ -0,0 +1,182 @@
+import time
+
+from .config import OSU_LOOKAHEAD
+from .hitobject_table import HitObjectTable, KIND_CIRCLE, KIND_SLIDER, KIND_SPINNER
+from .metrics import metrics as shared_metrics
+
+
+class LiveActions:
+    """
+    Creates the real mouse-driving actions from modules.osu_input (Windows
+    only). With a CursorDriver, sliders and spinners are handed to it and
+    run at its fixed rate instead of once per step(). With the map's
+    TrajectoryPlan their positions are looked up in it (PlannedAction)
+    rather than computed from the slider path each update.
+    """
+    def __init__(self, driver=None, plan=None):
+        from . import osu_input
+        self.osu_input = osu_input
+        self.driver = driver
+        self.plan = plan
+
+    def _drive(self, action):
+        if self.driver is None:
+            return action
+        from .cursor_driver import DrivenAction
+        return DrivenAction(action, self.driver)
+
+    def circle(self, obj, coord):
+        x, y = self.osu_input.ai_to_screen(coord.x, coord.y, coord.screen_x, coord.screen_y)
+        return self.osu_input.CircleAction(obj, x, y)
+
+    def slider(self, obj):
+        if self.plan is not None:
+            return self._drive(self.osu_input.PlannedAction(obj, self.plan))
+        return self._drive(self.osu_input.SliderAction(obj))
+
+    def spinner(self, obj):
+        if self.plan is not None:
+            return self._drive(self.osu_input.PlannedAction(obj, self.plan))
+        return self._drive(self.osu_input.SpinnerAction(obj))
+
+
+class ObjectMatcher:
+    """
+    Matches ready detections from a CoordQueue to the map's next hit object
+    and drives the resulting action, one step() per main loop iteration.
+
+    clock() returns ms since the run started, the same time base the
+    detections are stamped with; start_ms is the map time at clock 0.
+    Actions are made by the actions factory (LiveActions by default) and
+    updated with map time in seconds. Every queue item consumed by a match
+    is kept in .removed (used to replicate maps).
+
+    Queue scan, matching and action update times go into metrics, as does
+    detection_to_action: clock time when an action is created minus the
+    capture time of the detection it was matched to.
+    """
+    def __init__(self, hitobjects, coord_queue, ar_delay, start_ms, clock, actions=None,
+                 lookahead=OSU_LOOKAHEAD, verbose=True, metrics=None):
+        self.objects = hitobjects if isinstance(hitobjects, HitObjectTable) else HitObjectTable.from_objects(hitobjects)
+        self.kinds = self.objects.kind.tolist()
+        self.coord_queue = coord_queue
+        self.ar_delay = ar_delay
+        self.start_ms = start_ms
+        self.clock = clock
+        self.actions = actions if actions is not None else LiveActions()
+        self.lookahead = lookahead
+        self.verbose = verbose
+
+        self.index = 0
+        self.current_action = None
+        self.coord = None
+        self.removed = []
+
+        metrics = metrics or shared_metrics
+        self._h_scan = metrics.histogram("queue_scan")
+        self._h_match = metrics.histogram("match")
+        self._h_update = metrics.histogram("action_update")
+        self._h_latency = metrics.histogram("detection_to_action")
+
+    @property
+    def finished(self):
+        return self.index >= len(self.kinds)
+
+    def map_time(self):
+        """Current map time in seconds."""
+        return (self.clock() + self.start_ms) / 1000
+
+    def _remove(self, coord):
+        self._h_latency.record(self.clock() - coord.time_ms)
+        removed = self.coord_queue.remove(coord)
+        if removed:
+            self.removed.append(removed)
+
+    def _match(self):
+        while not self.finished and self.current_action is None:
+            obj = self.objects[self.index]
+            kind = self.kinds[self.index]
+            coord = self.coord
+            now_t = self.map_time()
+
+            # Match based on expected class logic
+            if kind == KIND_CIRCLE and coord.cls == "circle":
+                self.current_action = self.actions.circle(obj, coord)
+                self._remove(coord)
+                break
+
+            if kind == KIND_SLIDER:
+                # not started yet: retry next step, so detections keep flowing in meanwhile
+                if now_t >= (obj.time / 1000):
+                    self.current_action = self.actions.slider(obj)
+                    self._remove(coord)
+                break
+
+            elif kind == KIND_SPINNER:
+                if now_t >= (obj.time / 1000):
+                    self.current_action = self.actions.spinner(obj)
+                break
+
+            else:
+                skip_steps = 0
+                for i in range(self.index, min(self.index + self.lookahead, len(self.kinds))):
+                    if self.kinds[i] == KIND_SLIDER:
+                        skip_steps = i - self.index
+                        break
+                if skip_steps:
+                    if self.verbose:
+                        print(f"Skipping from {obj} to {coord.cls}. Step is {skip_steps}")
+                    self.index += skip_steps
+                else:
+                    self.coord_queue.remove(coord)
+                    break
+
+    def next_deadline(self, update_interval_ms):
+        """
+        Clock ms at which step() next has work: the next action update (or,
+        for an action run by a CursorDriver, its end), the current spinner's
+        start, or when the oldest queued detection's AR delay expires (not
+        before the slider it would start). None when only new detections
+        can change anything.
+        """
+        if self.finished:
+            return None
+        if self.current_action is not None:
+            now = self.clock()
+            if getattr(self.current_action, "driven", False):
+                return max(self.current_action.end_t * 1000 - self.start_ms, now + update_interval_ms)
+            return now + update_interval_ms
+        kind = self.kinds[self.index]
+        due_ms = float(self.objects.time[self.index]) - self.start_ms
+        if kind == KIND_SPINNER:
+            return due_ms
+        queue = self.coord_queue.queue
+        if not queue:
+            return None
+        ready_ms = queue[0].time_ms + self.ar_delay
+        return max(ready_ms, due_ms) if kind == KIND_SLIDER else ready_ms
+
+    def step(self):
+        """Match the oldest ready detection if idle, then update the current action."""
+        if self.finished:
+            return
+        # Oldest detection whose AR delay has passed (queue is time-ordered)
+        t0 = time.perf_counter()
+        ready = self.coord_queue.peek_ready(self.clock(), self.ar_delay)
+        if ready is not None:
+            self.coord = ready
+        t1 = time.perf_counter()
+        self._h_scan.record((t1 - t0) * 1000)
+
+        if (self.current_action is None and ready is not None) or self.kinds[self.index] == KIND_SPINNER:
+            self._match()
+            t2 = time.perf_counter()
+            self._h_match.record((t2 - t1) * 1000)
+            t1 = t2
+
+        if self.current_action is not None:
+            self.current_action.update(self.map_time())
+            self._h_update.record((time.perf_counter() - t1) * 1000)
+            if self.current_action.done:
+                self.current_action = None
+                self.index += 1
@@ -0,0 +1,177 @@
+import json
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from .config import METRICS_PATH, METRICS_DUMP_INTERVAL, METRICS_SIGNIFICANT_DIGITS, METRICS_MAX_MS
+
+
+class LatencyHistogram:
+    """
+    HDR-style histogram of millisecond values, stored in microseconds.
+
+    Buckets are powers of two, each split into linear sub-buckets, so
+    every recorded value keeps significant_digits of precision from 1 us
+    up to highest_ms, with a fixed, small count array. record() is a few
+    integer operations; percentiles walk the counts.
+    """
+    def __init__(self, significant_digits=METRICS_SIGNIFICANT_DIGITS, highest_ms=METRICS_MAX_MS):
+        sub_bucket_count = 1 << math.ceil(math.log2(2 * 10 ** significant_digits))
+        self.sub_bucket_bits = sub_bucket_count.bit_length() - 1
+        self.sub_bucket_half = sub_bucket_count // 2
+        self.highest_us = int(highest_ms * 1000)
+        buckets = max(0, self.highest_us.bit_length() - self.sub_bucket_bits) + 1
+        self.counts = [0] * (buckets * self.sub_bucket_half + self.sub_bucket_half)
+        self.reset()
+
+    def reset(self):
+        for i in range(len(self.counts)):
+            self.counts[i] = 0
+        self.count = 0
+        self.total_us = 0
+        self.min_us = self.highest_us
+        self.max_us = 0
+
+    def _value(self, index):
+        """Highest value (us) that maps to index."""
+        bucket, sub = divmod(index, self.sub_bucket_half)
+        if bucket == 0:
+            return index
+        bucket -= 1
+        sub += self.sub_bucket_half
+        return ((sub + 1) << bucket) - 1
+
+    def record(self, ms):
+        v = int(ms * 1000)
+        if v < 0:
+            v = 0
+        elif v > self.highest_us:
+            v = self.highest_us
+        # values below sub_bucket_count index themselves, above that bucket = power of two
+        bucket = v.bit_length() - self.sub_bucket_bits
+        self.counts[v if bucket <= 0 else bucket * self.sub_bucket_half + (v >> bucket)] += 1
+        self.count += 1
+        self.total_us += v
+        if v < self.min_us:
+            self.min_us = v
+        if v > self.max_us:
+            self.max_us = v
+
+    def percentile(self, q):
+        """Value (ms) at or below which q percent of the recorded values fall."""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * q / 100))
+        seen = 0
+        for i, c in enumerate(self.counts):
+            if c:
+                seen += c
+                if seen >= target:
+                    return min(self._value(i), self.max_us) / 1000
+        return self.max_us / 1000
+
+    def summary(self, quantiles=(50, 90, 99, 99.9)):
+        out = {
+            "count": self.count,
+            "min": (self.min_us if self.count else 0) / 1000,
+            "max": self.max_us / 1000,
+            "mean": round(self.total_us / self.count / 1000, 3) if self.count else 0.0,
+        }
+        for q in quantiles:
+            out[f"p{q:g}"] = self.percentile(q)
+        return out
+
+
+class Metrics:
+    """
+    Named latency histograms (ms). Hot paths call record(name, ms) with
+    their own perf_counter() deltas; time(name) is a context manager for
+    code that isn't that hot. Names are created on first use.
+    """
+    def __init__(self):
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self.started = time.time()
+
+    def histogram(self, name):
+        h = self.histograms.get(name)
+        if h is None:
+            with self._lock:
+                h = self.histograms.setdefault(name, LatencyHistogram())
+        return h
+
+    def record(self, name, ms):
+        self.histogram(name).record(ms)
+
+    @contextmanager
+    def time(self, name):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, (time.perf_counter() - t0) * 1000)
+
+    def reset(self):
+        for h in list(self.histograms.values()):
+            h.reset()
+
+    def snapshot(self):
+        return {name: h.summary() for name, h in sorted(self.histograms.items())}
+
+    def report(self):
+        """One line per stage: count, p50 / p99 / max in ms."""
+        lines = []
+        for name, s in self.snapshot().items():
+            lines.append(f"{name:22s} n={s['count']:<8d} p50={s['p50']:9.3f}  p99={s['p99']:9.3f}  max={s['max']:9.3f} ms")
+        return "\n".join(lines)
+
+    # -------------------------------
+    # Export
+    # -------------------------------
+    def to_json(self):
+        return json.dumps({"timestamp": time.time(), "uptime_s": round(time.time() - self.started, 3),
+                           "stages_ms": self.snapshot()}, indent=2)
+
+    def to_prometheus(self, prefix="osu_hax"):
+        """Prometheus text format: one summary per stage, in seconds."""
+        lines = []
+        for name, h in sorted(self.histograms.items()):
+            metric = f"{prefix}_{name}_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for q in (0.5, 0.9, 0.99, 0.999):
+                lines.append(f'{metric}{{quantile="{q:g}"}} {h.percentile(q * 100) / 1000:.6f}')
+            lines.append(f"{metric}_sum {h.total_us / 1e6:.6f}")
+            lines.append(f"{metric}_count {h.count}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path=METRICS_PATH):
+        """Write JSON (or Prometheus text for *.prom / *.txt) atomically."""
+        text = self.to_prometheus() if path.endswith((".prom", ".txt")) else self.to_json()
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+
+class MetricsDumper(threading.Thread):
+    """Writes metrics.dump(path) every interval seconds, and once more on stop()."""
+    def __init__(self, metrics, path=METRICS_PATH, interval=METRICS_DUMP_INTERVAL):
+        super().__init__(name="metrics", daemon=True)
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            self.metrics.dump(self.path)
+        self.metrics.dump(self.path)
+
+
+# shared instance the pipeline stages record into
+metrics = Metrics()
@@ -5,8 +5,10 @@ import win32gui
 import math
 
 from .config import *
+from .playfield import playfield
+from .scheduler import Scheduler
 from .read_map import *
-from .slidercalculation import bezier_point, sample_curve, point_at_progress, sample_polyline, scale_samples_to_length
+from .slidercalculation import slider_paths, point_at_progress, slide_progress
 
 global screen_w, screen_h
 screen_w, screen_h = pyautogui.size()
@@ -28,62 +30,16 @@ def is_time(ms, start_time):
     return (now - start_time) >= target
 
 def find_osu_window():
-    result = [None]  # store hwnd in a mutable list
-    
-    def callback(hwnd, _):
-        title = win32gui.GetWindowText(hwnd)
-        if title.startswith("osu!"):
-            result[0] = hwnd
-
-    win32gui.EnumWindows(callback, None)
-    return result[0]
+    return playfield.provider.find_window()
 
 def get_osu_client_rect():
-        hwnd_osu = find_osu_window()
-    
-        # left, top, right, bottom in client coordinates
-        left, top, right, bottom = win32gui.GetClientRect(hwnd_osu)
-
-        # convert top-left & bottom-right to absolute screen coords
-        tl = win32gui.ClientToScreen(hwnd_osu, (left, top))
-        br = win32gui.ClientToScreen(hwnd_osu, (right, bottom))
-
-        return tl[0], tl[1], br[0], br[1]
-
+    return playfield.client_rect()
 
 def osu_to_screen(osu_x, osu_y):
-    # Get CLIENT RECT (width & height)
-    left, top, right, bottom = get_osu_client_rect()
-    osu_w = right - left
-    osu_h = bottom - top
-
-    # Compute playfield size
-    play_h = 0.8 * osu_h
-    play_w = (4 / 3) * play_h
-
-    # Center horizontally, center vertically, then apply 2% downward offset
-    play_left = (osu_w - play_w) / 2
-    play_top  = (osu_h - play_h) / 2 + play_h * 0.02
-
-    # Scale factor
-    osu_scale = play_h / 384  # = play_w / 512
-
-    # Final position inside client → convert to screen space
-    screen_x = int(osu_x * osu_scale + play_left + left)
-    screen_y = int(osu_y * osu_scale + play_top  + top)
-
-    return screen_x, screen_y
+    return playfield.osu_to_screen(osu_x, osu_y)
 
 def ai_to_screen(ai_x, ai_y, image_width, image_height):
-    left, top, right, bottom = get_osu_client_rect()
-    osu_width = right - left
-    osu_height = bottom - top
-
-    # scale from screenshot → osu window
-    screen_x = left + (ai_x / image_width) * osu_width
-    screen_y = top + (ai_y / image_height) * osu_height
-
-    return int(screen_x), int(screen_y)
+    return playfield.ai_to_screen(ai_x, ai_y, image_width, image_height)
 
 
 def wait_for_title_change(timeout=5):
@@ -92,18 +48,27 @@ def wait_for_title_change(timeout=5):
     start_title = win32gui.GetWindowText(hwnd)
     print(f"[INFO] Initial title: {start_title}")
 
-    start_time = time.time()
+    # no cheap notification for a title change, so it is a scheduled check
+    # every TITLE_POLL_MS plus a timeout event
+    scheduler = Scheduler()
+    result = [None]
 
-    while time.time() - start_time < timeout:
+    def check_title():
         new_title = win32gui.GetWindowText(hwnd)
         if new_title != start_title:
             print(f"[INFO] Title changed!")
             print(f"[INFO] New title: {new_title}")
-            return new_title
-        time.sleep(0.01)  # 10 ms polling, very accurate
+            result[0] = new_title
+            scheduler.stop()
 
-    print("[WARN] Timeout waiting for title change.")
-    return None
+    def expire():
+        print("[WARN] Timeout waiting for title change.")
+        scheduler.stop()
+
+    scheduler.call_every(TITLE_POLL_MS, check_title, "title_poll", first_ms=scheduler.clock(), precise=False)
+    scheduler.call_later(timeout * 1000, expire, "title_timeout", precise=False)
+    scheduler.run()
+    return result[0]
 
 class CircleAction:
     def __init__(self, obj, x, y):
@@ -129,52 +94,35 @@ class SliderAction:
         self.done = False
         self.type = 2
         self.endTime = obj.time + obj.duration_ms
+        self.start_t = obj.time / 1000
+        self.end_t = self.endTime / 1000
 
-        # --- Build full curve control points ---
-        cp = [(obj.x, obj.y)] + obj.points
-
-        # --- L-type: simple lerp between endpoints ---
-        if obj.curveType == "L":
-            self.samples, self.dists = sample_polyline(cp, n_per_segment=12)
-            return
-
-        # --- B-type: sample full bezier ---
-        if obj.curveType == "B":
-            eval_fn = lambda t: bezier_point(cp, t)
-            samples, dists = sample_curve(eval_fn, n=300)
-            self.samples, self.dists = scale_samples_to_length(samples, dists, obj.length)
-            return
-
-        print("Unsupported curve type:", obj.curveType)
-
-    def update(self, t):
-        if self.done:
-            return
-
-        start_t = self.obj.time / 1000
-        end_t = self.endTime / 1000
+        # --- Sampled path (L / P / B / C), normally precomputed at map load ---
+        self.samples, self.dists = slider_paths.get_lists(obj)
+        self.duration_t = self.end_t - self.start_t
+        self.slides = int(obj.slides)
 
+    def position(self, t):
+        """(screen_x, screen_y, button_down) at map time t, a pure function of t."""
         # raw slider progress
-        progress_raw = (t - start_t) / (end_t - start_t)
-        progress_raw = max(0, min(progress_raw, 1))
-
-        # slidebacks
-        total = progress_raw * self.obj.slides
-        slide_index = int(total)
-        slide_pos = total - slide_index
+        progress_raw = (t - self.start_t) / self.duration_t
 
-        if slide_index % 2 == 0:
-            progress = slide_pos
-        else:
-            progress = 1 - slide_pos
+        # slidebacks (clamps progress_raw to [0, 1] itself)
+        progress = slide_progress(progress_raw, self.slides)
 
         # get arc-length-correct point
         px, py = point_at_progress(self.samples, self.dists, progress)
 
         sx, sy = osu_to_screen(px, py)
+        return sx, sy, progress_raw < 1
+
+    def update(self, t):
+        if self.done:
+            return
+        sx, sy, down = self.position(t)
         set_cursor(sx, sy)
         mouse_leftdown()
-        if progress_raw  >= 1:
+        if not down:
             mouse_leftup()
             self.done = True
 
@@ -185,8 +133,18 @@ class SpinnerAction:
         self.done = False
         self.type = 8
 
+        self.start_t = obj.time / 1000
         self.end_t = obj.endTime / 1000
-        self.angle = 0
+        # angle comes from the clock, so spin speed doesn't depend on how often update() runs
+        self.rad_per_s = 2 * math.pi * SPINNER_RPM / 60
+
+    def position(self, t):
+        """(screen_x, screen_y, button_down) at map time t, a pure function of t."""
+        angle = self.rad_per_s * max(0.0, t - self.start_t)
+        # same circle as compile_trajectory (radius in osu px)
+        sx, sy = osu_to_screen(self.obj.x + SPINNER_RADIUS * math.cos(angle),
+                               self.obj.y + SPINNER_RADIUS * math.sin(angle))
+        return sx, sy, t < self.end_t
 
     def update(self, t):
         if t >= self.end_t:
@@ -194,16 +152,41 @@ class SpinnerAction:
             self.done = True
             return
 
-        cx, cy = osu_to_screen(self.obj.x, self.obj.y)
-        r = 50
-
-        sx = int(cx + r * math.cos(self.angle))
-        sy = int(cy + r * math.sin(self.angle))
-
+        sx, sy, _ = self.position(t)
         set_cursor(sx, sy)
         mouse_leftdown()
-        self.angle += 1.0
 
 
-    
+class PlannedAction:
+    """
+    Slider / spinner read from the map's compiled TrajectoryPlan instead
+    of evaluated: position(t) is one plan.at() index lookup. The button
+    is held until the object's own end, as in SliderAction / SpinnerAction.
+    """
+    def __init__(self, obj, plan):
+        self.obj = obj
+        self.plan = plan
+        self.done = False
+        self.type = 8 if isinstance(obj, Spinner) else 2
 
+        end_ms = obj.endTime if isinstance(obj, Spinner) else obj.time + obj.duration_ms
+        self.start_t = obj.time / 1000
+        self.end_t = end_ms / 1000
+        # this object's own samples, so its first / last tick can't land on a neighbour's
+        self.first, self.last = plan.span(obj.time, end_ms)
+
+    def position(self, t):
+        """(screen_x, screen_y, button_down) at map time t, a pure function of t."""
+        px, py, _ = self.plan.at(t * 1000, self.first, self.last)
+        sx, sy = osu_to_screen(px, py)
+        return sx, sy, t < self.end_t
+
+    def update(self, t):
+        if self.done:
+            return
+        sx, sy, down = self.position(t)
+        set_cursor(sx, sy)
+        mouse_leftdown()
+        if not down:
+            mouse_leftup()
+            self.done = True
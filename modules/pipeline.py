@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import deque
+
+from .coord_queue import hittable
+from .metrics import metrics as shared_metrics
+
+
+class LatestSlot:
+    """
+    Single-slot buffer: put() overwrites whatever wasn't consumed yet
+    (counted in .dropped), get() waits for something newer than the last
+    item it returned. Stale frames are replaced, never queued.
+    """
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._seq = 0
+        self._taken = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if self._seq > self._taken:
+                self.dropped += 1
+            self._item = item
+            self._seq += 1
+            self._cond.notify_all()
+
+    def get(self, timeout=None):
+        """Newest item not returned before, or None on timeout."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._seq > self._taken, timeout):
+                return None
+            self._taken = self._seq
+            return self._item
+
+    def get_nowait(self):
+        with self._cond:
+            if self._seq <= self._taken:
+                return None
+            self._taken = self._seq
+            return self._item
+
+    def peek(self):
+        """Latest item, whether or not it was already taken."""
+        return self._item
+
+    @property
+    def seq(self):
+        return self._seq
+
+
+class RingBuffer:
+    """
+    Bounded FIFO between threads; when full the oldest item is dropped.
+    on_put (e.g. Scheduler.wake) is called after every put.
+    """
+    def __init__(self, maxlen, on_put=None):
+        self._items = deque(maxlen=maxlen)
+        self._lock = threading.Lock()
+        self.dropped = 0
+        self.on_put = on_put
+
+    def put(self, item):
+        with self._lock:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+        if self.on_put is not None:
+            self.on_put()
+
+    def drain(self):
+        with self._lock:
+            items = list(self._items)
+            self._items.clear()
+        return items
+
+    def __len__(self):
+        return len(self._items)
+
+
+class CapturedFrame:
+    __slots__ = ("seq", "frame", "capture_ms")
+
+    def __init__(self, seq, frame, capture_ms):
+        self.seq = seq
+        self.frame = frame
+        self.capture_ms = capture_ms  # time.perf_counter() * 1000 at arrival
+
+
+class InferenceWorker(threading.Thread):
+    """
+    Inference stage: takes the newest captured frame, converts it, runs the
+    detector (see modules.detector) and pushes a filtered DetectionBatch to
+    the detection buffer.
+    convert(frame) returns (image, FrameMapping or None); with a mapping the
+    detections are mapped back to full-frame coordinates.
+    Detections are stamped with the frame's capture time (relative to
+    origin_ms), not the time inference finished.
+    With a gate (FrameChangeGate), frames it rejects skip the model and
+    put nothing: the detections already queued still stand, and replaying
+    them would count as new sightings in the DetectionTracker.
+    Stage timings and frame age also go into metrics histograms.
+    An exception from convert / the detector stops the worker: it is kept
+    in .error, on_error() is called (e.g. to stop the main scheduler) and
+    check() re-raises it on the caller's thread.
+    """
+    def __init__(self, detector, frame_slot, detection_buffer, convert, preview_slot=None, gate=None, metrics=None,
+                 on_error=None):
+        super().__init__(name="inference", daemon=True)
+        self.detector = detector
+        self.frame_slot = frame_slot
+        self.detection_buffer = detection_buffer
+        self.convert = convert
+        self.preview_slot = preview_slot
+        self.gate = gate
+        self.on_error = on_error
+        self.error = None
+        self.origin_ms = time.perf_counter() * 1000
+        self._stop_event = threading.Event()
+        metrics = metrics or shared_metrics
+        self._h_convert = metrics.histogram("convert")
+        self._h_gate = metrics.histogram("gate")
+        self._h_infer = metrics.histogram("infer")
+        self._h_postprocess = metrics.histogram("postprocess")
+        self._h_frame_age = metrics.histogram("frame_age")
+
+        # last per-stage timings (ms) and counters
+        self.frames = 0
+        self.convert_ms = 0.0
+        self.infer_ms = 0.0
+        self.frame_age_ms = 0.0
+
+    def stop(self):
+        self._stop_event.set()
+
+    def check(self):
+        if self.error is not None:
+            raise self.error
+
+    def run(self):
+        try:
+            self._run()
+        except Exception as e:
+            self.error = e
+            if self.on_error is not None:
+                self.on_error()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            captured = self.frame_slot.get(timeout=0.1)
+            if captured is None:
+                continue
+
+            t0 = time.perf_counter()
+            screenshot, mapping = self.convert(captured.frame)
+            t1 = time.perf_counter()
+            self._h_convert.record((t1 - t0) * 1000)
+            time_ms = round(captured.capture_ms - self.origin_ms)
+
+            if self.gate is not None and not self.gate.should_infer(screenshot, captured.capture_ms, captured.seq):
+                continue
+
+            t_infer = time.perf_counter()
+            self.frame_age_ms = t_infer * 1000 - captured.capture_ms
+            self._h_frame_age.record(self.frame_age_ms)
+            self._h_gate.record((t_infer - t1) * 1000)
+            detections = self.detector.infer(screenshot)
+            t2 = time.perf_counter()
+
+            batch = hittable(detections.restamp(time_ms))
+            if mapping is not None:
+                batch = batch.to_frame(mapping)
+            self.detection_buffer.put(batch)
+            self._h_infer.record((t2 - t_infer) * 1000)
+            self._h_postprocess.record((time.perf_counter() - t2) * 1000)
+            if self.preview_slot is not None:
+                self.preview_slot.put((screenshot, detections))
+
+            self.convert_ms = (t1 - t0) * 1000
+            self.infer_ms = (t2 - t_infer) * 1000
+            self.frames += 1
+
+    def stats(self):
+        return {
+            "frames": self.frames,
+            "frames_dropped": self.frame_slot.dropped,
+            "detections_dropped": self.detection_buffer.dropped,
+            "convert_ms": round(self.convert_ms, 2),
+            "infer_ms": round(self.infer_ms, 2),
+            "frame_age_ms": round(self.frame_age_ms, 2),
+            **({"gate": self.gate.stats()} if self.gate is not None else {}),
+        }
@@ -0,0 +1,246 @@
+import time
+
+import numpy as np
+
+from .config import PLAYFIELD_REFRESH_S
+
+OSU_WIDTH = 512
+OSU_HEIGHT = 384
+
+
+# -------------------------------
+# Window geometry providers
+# -------------------------------
+class Win32WindowProvider:
+    """Client rect of the osu! window through win32gui (Windows only, imported on first use)."""
+    def __init__(self, title_prefix="osu!"):
+        self.title_prefix = title_prefix
+        self.hwnd = None
+        self._win32gui = None
+
+    @property
+    def win32gui(self):
+        if self._win32gui is None:
+            import win32gui
+            self._win32gui = win32gui
+        return self._win32gui
+
+    def find_window(self):
+        result = [None]  # store hwnd in a mutable list
+
+        def callback(hwnd, _):
+            title = self.win32gui.GetWindowText(hwnd)
+            if title.startswith(self.title_prefix):
+                result[0] = hwnd
+
+        self.win32gui.EnumWindows(callback, None)
+        self.hwnd = result[0]
+        return self.hwnd
+
+    def _client_rect(self, hwnd):
+        # left, top, right, bottom in client coordinates
+        left, top, right, bottom = self.win32gui.GetClientRect(hwnd)
+        # convert top-left & bottom-right to absolute screen coords
+        tl = self.win32gui.ClientToScreen(hwnd, (left, top))
+        br = self.win32gui.ClientToScreen(hwnd, (right, bottom))
+        return tl[0], tl[1], br[0], br[1]
+
+    def client_rect(self):
+        if self.hwnd is None:
+            self.find_window()
+        try:
+            return self._client_rect(self.hwnd)
+        except Exception:
+            # window was closed / recreated, look it up again
+            self.find_window()
+            return self._client_rect(self.hwnd)
+
+
+class FakeWindowProvider:
+    """Fixed (or manually moved) client rect, for tests and benchmarks off Windows."""
+    def __init__(self, rect=(0, 0, 1920, 1080)):
+        self.rect = tuple(rect)
+        self.calls = 0
+
+    def find_window(self):
+        return 1
+
+    def client_rect(self):
+        self.calls += 1
+        return self.rect
+
+
+# -------------------------------
+# Cached transform
+# -------------------------------
+class PlayfieldGeometry:
+    """
+    Everything derived from one client rect, computed once and never
+    modified (the matrices are read-only): a window move builds a new
+    PlayfieldGeometry, so readers always see a consistent set of values.
+    """
+    __slots__ = ("rect", "osu_scale", "offset_x", "offset_y", "playfield_rect",
+                 "osu_to_screen_matrix", "screen_to_osu_matrix", "_image_matrices")
+
+    def __init__(self, rect):
+        left, top, right, bottom = rect
+        self.rect = (left, top, right, bottom)
+        osu_w = right - left
+        osu_h = bottom - top
+
+        # Compute playfield size
+        play_h = 0.8 * osu_h
+        play_w = (4 / 3) * play_h
+
+        # Center horizontally, center vertically, then apply 2% downward offset
+        play_left = (osu_w - play_w) / 2
+        play_top = (osu_h - play_h) / 2 + play_h * 0.02
+
+        self.osu_scale = play_h / OSU_HEIGHT  # = play_w / 512
+        self.offset_x = play_left + left
+        self.offset_y = play_top + top
+        # playfield rect inside the client area (client coordinates)
+        self.playfield_rect = (play_left, play_top, play_left + play_w, play_top + play_h)
+
+        s = self.osu_scale
+        self.osu_to_screen_matrix = np.array([[s, 0, self.offset_x],
+                                              [0, s, self.offset_y],
+                                              [0, 0, 1]])
+        self.screen_to_osu_matrix = np.linalg.inv(self.osu_to_screen_matrix)
+        self.osu_to_screen_matrix.flags.writeable = False
+        self.screen_to_osu_matrix.flags.writeable = False
+        self._image_matrices = {}
+
+    def image_to_screen_matrix(self, image_width, image_height):
+        """Affine matrix from model image pixels (full-window screenshot) to screen."""
+        key = (image_width, image_height)
+        m = self._image_matrices.get(key)
+        if m is None:
+            left, top, right, bottom = self.rect
+            m = np.array([[(right - left) / image_width, 0, left],
+                          [0, (bottom - top) / image_height, top],
+                          [0, 0, 1]])
+            m.flags.writeable = False
+            self._image_matrices[key] = m
+        return m
+
+
+class PlayfieldTransform:
+    """
+    osu! pixel <-> screen <-> model image coordinate transforms.
+
+    The window's client rect is cached and only re-read every
+    refresh_interval seconds or after invalidate(). FramePreprocessor
+    calls invalidate() when the captured frame changes size (a resize);
+    a pure window move is picked up on the next interval refresh. Each
+    refresh builds a new PlayfieldGeometry with the affine matrices
+    precomputed and swaps it in with a single assignment, so the
+    inference, cursor and main threads never see half of an update.
+    Single conversions are a multiply-add and the *_batch methods convert
+    whole NumPy arrays at once. geometry() gives one consistent snapshot
+    for code that needs several values.
+    """
+    def __init__(self, provider, refresh_interval=PLAYFIELD_REFRESH_S):
+        self.provider = provider
+        self.refresh_interval = refresh_interval
+        self._last_refresh = None
+        self._geometry = None
+
+    def invalidate(self):
+        self._last_refresh = None
+
+    def refresh(self):
+        self._geometry = PlayfieldGeometry(self.provider.client_rect())
+        self._last_refresh = time.perf_counter()
+        return self._geometry
+
+    def geometry(self):
+        last = self._last_refresh
+        if last is None or time.perf_counter() - last >= self.refresh_interval:
+            return self.refresh()
+        return self._geometry
+
+    # current geometry values, for callers that only need one of them
+    @property
+    def rect(self):
+        return self.geometry().rect
+
+    @property
+    def osu_scale(self):
+        return self.geometry().osu_scale
+
+    @property
+    def offset_x(self):
+        return self.geometry().offset_x
+
+    @property
+    def offset_y(self):
+        return self.geometry().offset_y
+
+    @property
+    def playfield_rect(self):
+        return self.geometry().playfield_rect
+
+    @property
+    def osu_to_screen_matrix(self):
+        return self.geometry().osu_to_screen_matrix
+
+    @property
+    def screen_to_osu_matrix(self):
+        return self.geometry().screen_to_osu_matrix
+
+    def client_rect(self):
+        return self.geometry().rect
+
+    def image_to_screen_matrix(self, image_width, image_height):
+        """Affine matrix from model image pixels (full-window screenshot) to screen."""
+        return self.geometry().image_to_screen_matrix(image_width, image_height)
+
+    # -------------------------------
+    # Single points (same rounding as before: int())
+    # -------------------------------
+    def osu_to_screen(self, osu_x, osu_y):
+        g = self.geometry()
+        return (int(osu_x * g.osu_scale + g.offset_x),
+                int(osu_y * g.osu_scale + g.offset_y))
+
+    def screen_to_osu(self, screen_x, screen_y):
+        g = self.geometry()
+        return (int((screen_x - g.offset_x) / g.osu_scale),
+                int((screen_y - g.offset_y) / g.osu_scale))
+
+    def ai_to_screen(self, ai_x, ai_y, image_width, image_height):
+        left, top, right, bottom = self.geometry().rect
+        # scale from screenshot → osu window
+        screen_x = left + (ai_x / image_width) * (right - left)
+        screen_y = top + (ai_y / image_height) * (bottom - top)
+        return int(screen_x), int(screen_y)
+
+    def ai_to_osu(self, ai_x, ai_y, image_width, image_height):
+        return self.screen_to_osu(*self.ai_to_screen(ai_x, ai_y, image_width, image_height))
+
+    # -------------------------------
+    # Batches: (n, 2) arrays in, (n, 2) float arrays out
+    # -------------------------------
+    @staticmethod
+    def _apply(m, pts):
+        pts = np.asarray(pts, dtype=np.float64).reshape(-1, 2)
+        return pts @ m[:2, :2].T + m[:2, 2]
+
+    def osu_to_screen_batch(self, pts):
+        return self._apply(self.geometry().osu_to_screen_matrix, pts)
+
+    def screen_to_osu_batch(self, pts):
+        return self._apply(self.geometry().screen_to_osu_matrix, pts)
+
+    def ai_to_screen_batch(self, pts, image_width, image_height):
+        return self._apply(self.geometry().image_to_screen_matrix(image_width, image_height), pts)
+
+    def ai_to_osu_batch(self, pts, image_width, image_height):
+        g = self.geometry()
+        m = g.screen_to_osu_matrix @ g.image_to_screen_matrix(image_width, image_height)
+        return self._apply(m, pts)
+
+
+# shared instance for the live osu! window; swap .provider for a FakeWindowProvider off Windows
+playfield = PlayfieldTransform(Win32WindowProvider())
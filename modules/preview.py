@@ -0,0 +1,61 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+import supervision as svi
+
+from .config import PREVIEW_MAX_FPS
+from .coord_queue import CLASS_NAMES
+
+
+def to_supervision(batch):
+    """DetectionBatch (centre x/y, width, height) -> supervision Detections."""
+    half_w, half_h = batch.width / 2, batch.height / 2
+    xyxy = np.column_stack((batch.x - half_w, batch.y - half_h, batch.x + half_w, batch.y + half_h))
+    return svi.Detections(xyxy=xyxy.reshape(-1, 4), confidence=batch.confidence,
+                          class_id=batch.class_id.astype(int),
+                          data={"class_name": np.array([CLASS_NAMES[c] for c in batch.class_id.tolist()])})
+
+
+class PreviewWorker(threading.Thread):
+    """
+    Renders the annotated preview window off the hot loop. Gets the newest
+    (screenshot, DetectionBatch) pair from a LatestSlot, draws at most max_fps
+    times per second with annotators created once, and owns every HighGUI
+    call (imshow / waitKey / destroyWindow) so they stay on one thread.
+    """
+    def __init__(self, preview_slot, max_fps=PREVIEW_MAX_FPS, window_name="Fake Osu!"):
+        super().__init__(name="preview", daemon=True)
+        self.preview_slot = preview_slot
+        self.min_interval = 1.0 / max_fps
+        self.window_name = window_name
+        self._stop_event = threading.Event()
+
+        # create supervision annotators once
+        self.bounding_box_annotator = svi.BoxAnnotator()
+        self.label_annotator = svi.LabelAnnotator()
+        self.rendered = 0
+
+    def stop(self):
+        self._stop_event.set()
+
+    def run(self):
+        last_render = 0.0
+        while not self._stop_event.is_set():
+            preview = self.preview_slot.get(timeout=0.05)
+            if preview is not None and time.perf_counter() - last_render >= self.min_interval:
+                screenshot, batch = preview
+
+                # load the detections into the supervision Detections api
+                detections = to_supervision(batch)
+
+                # annotate a copy, the screenshot buffer is reused by the preprocessor
+                annotated_image = self.bounding_box_annotator.annotate(scene=screenshot.copy(), detections=detections)
+                annotated_image = self.label_annotator.annotate(scene=annotated_image, detections=detections)
+
+                cv2.imshow(self.window_name, annotated_image)
+                last_render = time.perf_counter()
+                self.rendered += 1
+            cv2.waitKey(1)
+        cv2.destroyWindow(self.window_name)
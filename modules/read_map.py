@@ -1,5 +1,13 @@
+import bisect
 from dataclasses import dataclass, field
-from typing import List, Tuple, Optional
+from typing import Dict, Iterator, List, Tuple, Optional
+
+import numpy as np
+
+from .slidercalculation import slider_paths
+
+# bump whenever parsing / preparation output changes (invalidates the beatmap cache)
+PARSER_VERSION = 1
 
 @dataclass
 class TimingPoint:
@@ -48,7 +56,7 @@ class Slider:
     duration_ms: Optional[float] = None
     end_time: Optional[int] = None
 
-def parse_hitobject(line: str):
+def parse_hitobject(line: str, warn: bool = True):
     parts = line.split(",")
 
     x = int(parts[0])
@@ -103,7 +111,8 @@ def parse_hitobject(line: str):
                       curveType, points, slides, length, 
                       edgeSounds, edgeSets, extras)
 
-    print("Unknown hitobject type:", line)
+    if warn:
+        print("Unknown hitobject type:", line)
     return None
 
 def get_active_uninherited_timing(timing_points: List[TimingPoint], ms_time: int) -> Optional[TimingPoint]:
@@ -142,142 +151,244 @@ def get_active_inherited_timing(timing_points: List[TimingPoint], ms_time: int)
             break
     return last
 
-def compute_slider_timings(hitobjects: List, timing_points: List[TimingPoint], slider_multiplier: float):
+class TimingIndex:
+    """
+    Timing points split into red (uninherited) and green (inherited) lines,
+    built once per map. Point queries use bisect instead of scanning the
+    whole list, and slider_timings() times every slider in one NumPy pass.
+    Same lookup rules as get_active_uninherited_timing / get_active_inherited_timing.
+    """
+    def __init__(self, timing_points: List[TimingPoint]):
+        self.red = [tp for tp in timing_points if tp.uninherited]
+        self.green = [tp for tp in timing_points if not tp.uninherited]
+        self.red_times = [tp.time for tp in self.red]
+        self.green_times = [tp.time for tp in self.green]
+
+        # per-line values used by the batch path
+        self._red_times = np.array(self.red_times, dtype=np.int64)
+        self._green_times = np.array(self.green_times, dtype=np.int64)
+        self._red_beat_length = np.array([tp.beat_length for tp in self.red], dtype=np.float64)
+        green_bl = np.array([tp.beat_length for tp in self.green], dtype=np.float64)
+        with np.errstate(divide="ignore"):
+            self._green_sv = np.where(green_bl == 0, 1.0, 100.0 / np.abs(green_bl))
+
+    def uninherited_at(self, ms_time: int) -> Optional[TimingPoint]:
+        if not self.red:
+            return None
+        i = bisect.bisect_right(self.red_times, ms_time)
+        # fallback: first uninherited
+        return self.red[i - 1] if i > 0 else self.red[0]
+
+    def inherited_at(self, ms_time: int) -> Optional[TimingPoint]:
+        i = bisect.bisect_right(self.green_times, ms_time)
+        return self.green[i - 1] if i > 0 else None
+
+    def slider_timings(self, times, lengths, slides, slider_multiplier: float):
+        """
+        Vectorized slider timing. Takes arrays of start times, pixel lengths
+        and slide counts, returns (duration_ms, end_time) arrays.
+        """
+        times = np.asarray(times, dtype=np.int64)
+        lengths = np.asarray(lengths, dtype=np.float64)
+        slides = np.asarray(slides, dtype=np.float64)
+
+        # beatLength (ms per beat) from the active red line, 500ms (120 BPM) if none
+        if len(self._red_times):
+            ri = np.searchsorted(self._red_times, times, side="right") - 1
+            beat_length = self._red_beat_length[np.maximum(ri, 0)]
+        else:
+            beat_length = np.full(len(times), 500.0)
+
+        # SV from the active green line, 1.0 if none
+        if len(self._green_times):
+            gi = np.searchsorted(self._green_times, times, side="right") - 1
+            sv = np.where(gi >= 0, self._green_sv[np.maximum(gi, 0)], 1.0)
+        else:
+            sv = np.ones(len(times))
+
+        px_per_beat = slider_multiplier * 100.0 * sv
+        beats = (lengths * slides) / px_per_beat
+        duration_ms = beats * beat_length
+        end_time = np.rint(times + duration_ms).astype(np.int64)
+        return duration_ms, end_time
+
+    def slider_timing(self, slider: Slider, slider_multiplier: float):
+        """Single-slider version of slider_timings(), sets duration_ms / end_time in place."""
+        utp = self.uninherited_at(slider.time)
+        beat_length = 500.0 if utp is None else utp.beat_length
+
+        itp = self.inherited_at(slider.time)
+        if itp is None or itp.beat_length == 0:
+            sv = 1.0
+        else:
+            sv = 100.0 / abs(itp.beat_length)
+
+        px_per_beat = slider_multiplier * 100.0 * sv
+        beats = (slider.length * slider.slides) / px_per_beat
+        slider.duration_ms = beats * beat_length
+        slider.end_time = int(round(slider.time + slider.duration_ms))
+        return slider
+
+def compute_slider_timings(hitobjects: List, timing_points, slider_multiplier: float):
     """
     For each Slider object in hitobjects, compute:
       - slider.duration_ms (total ms across all repeats)
       - slider.end_time (ms absolute, start_time + duration)
     This modifies the Slider objects in-place.
-    Formula source: osu! wiki & community (see links in code comments).
+    timing_points can be a list of TimingPoint or a prebuilt TimingIndex.
+
+    Formula (osu! wiki & community):
+      SV         = 100 / abs(inherited_beat_length)   (green line, 1.0 if none)
+      pxPerBeat  = slider_multiplier * 100 * SV
+      beats      = (pixelLength * slides) / pxPerBeat
+      duration   = beats * beatLength                 (red line, 500ms if none)
     """
-    for obj in hitobjects:
-        if isinstance(obj, Slider):
-            start_ms = obj.time
-
-            # get uninherited (red) timing point for beatLength (ms per beat)
-            utp = get_active_uninherited_timing(timing_points, start_ms)
-            if utp is None:
-                # fallback default 500ms per beat (120 BPM)
-                beat_length = 500.0
-            else:
-                beat_length = utp.beat_length
-
-            # get inherited (green) timing point for slider velocity (SV)
-            itp = get_active_inherited_timing(timing_points, start_ms)
-
-            if itp is None:
-                sv = 1.0
-            else:
-                # inherited timing points store a negative beat_length representing SV.
-                # SV = 100 / abs(inherited_beat_length)
-                # (equivalently SV = -(1 / inherited_beat_length) * 100)
-                inherited_bl = itp.beat_length
-                if inherited_bl == 0:
-                    sv = 1.0
-                else:
-                    sv = 100.0 / abs(inherited_bl)
-
-            # pxPerBeat = slider_multiplier * 100 * SV
-            px_per_beat = slider_multiplier * 100.0 * sv
-
-            # number of traversals is obj.slides (this is the 'slides' field from .osu)
-            traversals = obj.slides
-
-            # total beats covered by slider = (pixelLength * traversals) / pxPerBeat
-            beats = (obj.length * traversals) / px_per_beat
-
-            # total ms = beats * beat_length
-            duration_ms = beats * beat_length
-
-            obj.duration_ms = duration_ms
-            obj.end_time = int(round(obj.time + duration_ms))
+    index = timing_points if isinstance(timing_points, TimingIndex) else TimingIndex(timing_points)
+    sliders = [obj for obj in hitobjects if isinstance(obj, Slider)]
+    if not sliders:
+        return hitobjects
+
+    duration_ms, end_time = index.slider_timings(
+        [obj.time for obj in sliders],
+        [obj.length for obj in sliders],
+        [obj.slides for obj in sliders],
+        slider_multiplier
+    )
+    for obj, d, e in zip(sliders, duration_ms.tolist(), end_time.tolist()):
+        obj.duration_ms = d
+        obj.end_time = e
 
     return hitobjects
 
 
-def read_osu_file(filepath):
+def parse_timing_point(line: str) -> Optional[TimingPoint]:
+    parts = line.split(",")
+    # time, beatLength, meter, sampleSet, sampleIndex, volume, uninherited, effects
+    if len(parts) < 8:
+        return None
+    return TimingPoint(
+        time=int(float(parts[0])),
+        beat_length=float(parts[1]),
+        meter=int(float(parts[2])) if parts[2] else 4,
+        sample_set=int(parts[3]) if parts[3] else 0,
+        sample_index=int(parts[4]) if parts[4] else 0,
+        volume=int(parts[5]) if parts[5] else 100,
+        uninherited=(int(parts[6]) == 1),
+        effects=int(parts[7]) if parts[7] else 0
+    )
+
+def index_sections(filepath) -> Dict[str, Tuple[int, int]]:
     """
-    Parses the osu file and returns:
-      - hitobjects: list of HitCircle|Slider|Spinner instances (in file order)
-      - timing_points: list of TimingPoint (in file order)
-      - slider_multiplier: float from [Difficulty] (SliderMultiplier)
+    Scan the file once (without parsing anything) and return the byte range
+    of every section body: {"[HitObjects]": (start, end), ...}
     """
-    hitobjects = []
-    timing_points: List[TimingPoint] = []
-    slider_multiplier = 1.0
-    approach_rate = None
-
+    sections: Dict[str, Tuple[int, int]] = {}
     section = None
-    with open(filepath, "r", encoding="utf8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-
-            # Section headers
-            if line.startswith("["):
-                section = line
+    start = 0
+    offset = 0
+    with open(filepath, "rb") as f:
+        for raw in f:
+            line_start = offset
+            offset += len(raw)
+            if raw.lstrip().startswith(b"["):
+                if section is not None:
+                    sections[section] = (start, line_start)
+                section = raw.strip().decode("utf8")
+                start = offset
+    if section is not None:
+        sections[section] = (start, offset)
+    return sections
+
+
+class OsuReader:
+    """
+    Section-indexed .osu reader. Only the byte offsets of each [Section] are
+    read up front; sections are parsed on demand and hit objects are
+    produced lazily, so [Difficulty] / [TimingPoints] are ready before
+    [HitObjects] has been touched. Hit objects of unknown type come out as
+    None and are counted in unknown_objects; warn_unknown=False stops them
+    being printed as well.
+    """
+    def __init__(self, filepath, warn_unknown=True):
+        self.filepath = filepath
+        self.sections = index_sections(filepath)
+        self.warn_unknown = warn_unknown
+        self.unknown_objects = 0
+
+    def iter_lines(self, section: str) -> Iterator[str]:
+        span = self.sections.get(section)
+        if span is None:
+            return
+        start, end = span
+        with open(self.filepath, "rb") as f:
+            f.seek(start)
+            pos = start
+            while pos < end:
+                raw = f.readline()
+                if not raw:
+                    break
+                pos += len(raw)
+                line = raw.decode("utf8").strip()
+                if line:
+                    yield line
+
+    def read_key_values(self, section: str) -> Dict[str, str]:
+        """Raw "Key: value" pairs of a section such as [General] or [Metadata]."""
+        values = {}
+        for line in self.iter_lines(section):
+            key, sep, value = line.partition(":")
+            if sep:
+                values[key.strip()] = value.strip()
+        return values
+
+    def read_difficulty(self) -> Dict[str, float]:
+        values = {}
+        for line in self.iter_lines("[Difficulty]"):
+            key, sep, value = line.partition(":")
+            if not sep:
                 continue
-
-            # ---------- Difficulty ----------
-            if section == "[Difficulty]":
-                if line.startswith("SliderMultiplier:"):
-                    try:
-                        slider_multiplier = float(line.split(":", 1)[1].strip())
-                    except Exception:
-                        pass
-                elif line.startswith("OverallDifficulty:"):
-                    try:
-                        overall_dificulty = float(line.split(":", 1)[1].strip())
-                    except Exception:
-                        pass
-                elif line.startswith("ApproachRate:"):
-                    try:
-                        approach_rate = float(line.split(":", 1)[1].strip())
-                    except Exception:
-                        pass
-
-            # ---------- Timing Points ----------
-            elif section == "[TimingPoints]":
-                parts = line.split(",")
-                # time, beatLength, meter, sampleSet, sampleIndex, volume, uninherited, effects
-                if len(parts) >= 8:
-                    tp_time = int(float(parts[0]))
-                    beat_length = float(parts[1])
-                    meter = int(float(parts[2])) if parts[2] else 4
-                    sample_set = int(parts[3]) if parts[3] else 0
-                    sample_index = int(parts[4]) if parts[4] else 0
-                    volume = int(parts[5]) if parts[5] else 100
-                    uninherited_flag = int(parts[6])
-                    effects = int(parts[7]) if parts[7] else 0
-                    tp = TimingPoint(
-                        time=tp_time,
-                        beat_length=beat_length,
-                        meter=meter,
-                        sample_set=sample_set,
-                        sample_index=sample_index,
-                        volume=volume,
-                        uninherited=(uninherited_flag == 1),
-                        effects=effects
-                    )
-                    timing_points.append(tp)
-
-            # ---------- Hit Objects ----------
-            elif section == "[HitObjects]":
-                hitobjects.append(parse_hitobject(line))
-
-    return hitobjects, timing_points, slider_multiplier, overall_dificulty, approach_rate
-
-def prep_osu_objects(filepath):
-    # Read file
-    hitobjects, timing_points, slider_multiplier, overall_dificulty, approach_rate = read_osu_file(filepath)
-
-
+            try:
+                values[key.strip()] = float(value.strip())
+            except ValueError:
+                pass
+        return values
+
+    def read_timing_points(self) -> List[TimingPoint]:
+        timing_points: List[TimingPoint] = []
+        for line in self.iter_lines("[TimingPoints]"):
+            tp = parse_timing_point(line)
+            if tp is not None:
+                timing_points.append(tp)
+        return timing_points
+
+    def read_header(self):
+        """
+        Everything needed before [HitObjects]: (timing_points,
+        slider_multiplier, overall_dificulty, approach_rate), with
+        approach_rate None if the map doesn't set it.
+        """
+        difficulty = self.read_difficulty()
+        timing_points = self.read_timing_points()
+        slider_multiplier = difficulty.get("SliderMultiplier", 1.0)
+        overall_dificulty = difficulty.get("OverallDifficulty", 5.0)
+        approach_rate = difficulty.get("ApproachRate")
+        return timing_points, slider_multiplier, overall_dificulty, approach_rate
+
+    def iter_hitobjects(self) -> Iterator:
+        for line in self.iter_lines("[HitObjects]"):
+            obj = parse_hitobject(line, self.warn_unknown)
+            if obj is None:
+                self.unknown_objects += 1
+            yield obj
+
+
+def compute_difficulty_delays(overall_dificulty, approach_rate):
+    """Return (time_delay_300, AR_delay) derived from OD / AR."""
     # calculate AR delay based on https://osu.ppy.sh/wiki/en/Beatmap/Approach_rate
     if approach_rate is None:
         approach_rate = overall_dificulty
 
-    if approach_rate <= 5: 
+    if approach_rate <= 5:
         AR_delay = 1200 + 120 * (5 - approach_rate)
     elif approach_rate:
         AR_delay = 1200 - 150 * (approach_rate - 5)
@@ -285,8 +396,63 @@ def prep_osu_objects(filepath):
     # calculate hit delay for perfect hit
     time_delay_300 =  ((80 - (6 * overall_dificulty)) / 1000)
 
-    # Get Slider timing (duration + end_time)
-    hitobjects = compute_slider_timings(hitobjects, timing_points, slider_multiplier)
+    return time_delay_300, AR_delay
+
+
+def read_osu_file(filepath):
+    """
+    Parses the osu file and returns:
+      - hitobjects: list of HitCircle|Slider|Spinner instances (in file order)
+      - timing_points: list of TimingPoint (in file order)
+      - slider_multiplier: float from [Difficulty] (SliderMultiplier)
+      - overall_dificulty, approach_rate (approach_rate is None if missing)
+    """
+    reader = OsuReader(filepath)
+    timing_points, slider_multiplier, overall_dificulty, approach_rate = reader.read_header()
+    hitobjects = list(reader.iter_hitobjects())
+
+    return hitobjects, timing_points, slider_multiplier, overall_dificulty, approach_rate
+
+def stream_osu_objects(filepath, slider_timings=True):
+    """
+    Streaming version of prep_osu_objects. filepath may also be an
+    already open OsuReader, so callers that read other sections too only
+    index the file once. Timing points and difficulty
+    values are returned right away; hit objects come from a generator that
+    parses [HitObjects] and computes slider timings one object at a time
+    (or not at all with slider_timings=False, for callers that time every
+    slider in one batch afterwards).
+    """
+    reader = filepath if isinstance(filepath, OsuReader) else OsuReader(filepath)
+    timing_points, slider_multiplier, overall_dificulty, approach_rate = reader.read_header()
+    time_delay_300, AR_delay = compute_difficulty_delays(overall_dificulty, approach_rate)
+    if not slider_timings:
+        return reader.iter_hitobjects(), timing_points, slider_multiplier, time_delay_300, AR_delay
+
+    timing_index = TimingIndex(timing_points)
+
+    def hitobjects():
+        for obj in reader.iter_hitobjects():
+            if isinstance(obj, Slider):
+                timing_index.slider_timing(obj, slider_multiplier)
+            yield obj
+
+    return hitobjects(), timing_points, slider_multiplier, time_delay_300, AR_delay
+
+def prep_osu_objects(filepath, precompute_paths=None):
+    """
+    stream_osu_objects, collected into a list, with slider timings
+    computed for the whole map in one batch (filepath: path or OsuReader).
+    precompute_paths: None, or "sync" / "thread" / "process" to also build
+    every slider's sampled path into slider_paths (see SliderPathCache).
+    """
+    hitobjects, timing_points, slider_multiplier, time_delay_300, AR_delay = stream_osu_objects(filepath, slider_timings=False)
+
+    # Get Slider timing (duration + end_time) for the whole map at once
+    hitobjects = compute_slider_timings(list(hitobjects), timing_points, slider_multiplier)
+
+    if precompute_paths:
+        slider_paths.precompute(hitobjects, mode=precompute_paths)
 
     return hitobjects, timing_points, slider_multiplier, time_delay_300, AR_delay
 
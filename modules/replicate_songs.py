@@ -1,6 +1,7 @@
-from inference import get_model
-from .osu_input import HitCircle, Slider, Spinner
-from .coord_queue import CoordQueue, DataAI
+from .osu_input import HitCircle
+from .coord_queue import CoordQueue
+from .detector import create_detector
+from .config import DETECTOR_BATCH_SIZE
 
 def make_osu_file(map_path, osu_objects, version="replicated"):
 
@@ -22,47 +23,36 @@ def make_osu_file(map_path, osu_objects, version="replicated"):
                 f.write(",".join(values))
                 f.write("\n")
 
-def create_osu_objects(ai_data):
+def create_osu_objects(ai_data, time_offset_ms=0):
     object = None
     x, y = ai_data.get_osu_coords()
-    time = ai_data.time_ms
+    time = round(ai_data.time_ms + time_offset_ms)
     # HitCircle
     if ai_data.cls == 'circle':
         object = HitCircle(x, y, time, 1, 0)
 
     return object
 
-def add_song_queue(coord_queue: CoordQueue, model, screenshot, now_t):
+def add_song_queue(coord_queue: CoordQueue, detector, screenshot, now_t):
     if screenshot is None:
         return
-    results = model.infer(screenshot)
-    clean = [
-                {
-                    "class": p.class_name,
-                    "confidence": float(p.confidence),
-                    "x": float(p.x),
-                    "y": float(p.y),
-                    "width": float(p.width),
-                    "height": float(p.height),
-                    "time_ms": round(now_t * 1000),
-                    "screen_x": int(screenshot.shape[1]),
-                    "screen_y": int(screenshot.shape[0])
-                }
-                for p in results[0].predictions
-            ]
-    for item in clean:
-        data_ai = DataAI(item)
-        coord_queue.add(data_ai)
-
-def queue_to_file(coord_queue: CoordQueue | list, map_path="./replicated_map/test1"):
+    coord_queue.add_batch(detector.infer(screenshot).restamp(round(now_t * 1000)))
+
+def add_song_queue_batch(coord_queue: CoordQueue, detector, screenshots, times):
+    """Same as add_song_queue for several frames, inferred in one batch."""
+    for batch, now_t in zip(detector.infer_batch(screenshots), times):
+        coord_queue.add_batch(batch.restamp(round(now_t * 1000)))
+
+def queue_to_file(coord_queue: CoordQueue | list, map_path="./replicated_map/test1", time_offset_ms=0):
+    """time_offset_ms is added to every detection time (e.g. to make them relative to the map start)."""
     print("Making .osu file......")
     osu_objects = []
     if isinstance(coord_queue, CoordQueue):
         for data_ai in coord_queue.queue:
-            osu_objects.append(create_osu_objects(data_ai))
+            osu_objects.append(create_osu_objects(data_ai, time_offset_ms))
     else:
         for data_ai in coord_queue:
-            osu_objects.append(create_osu_objects(data_ai))
+            osu_objects.append(create_osu_objects(data_ai, time_offset_ms))
     make_osu_file(map_path, osu_objects)
     print("Done!")
 
@@ -71,6 +61,9 @@ if __name__ == '__main__':
     import cv2
     from windows_capture import WindowsCapture, Frame, InternalCaptureControl
     import ctypes
+    from dotenv import load_dotenv
+
+    load_dotenv()
 
     latest_frame = None
 
@@ -96,10 +89,9 @@ if __name__ == '__main__':
         cv2.destroyAllWindows()
 
     capture.start_free_threaded()
-    model = get_model(
-        model_id="osu-project-2-don-t-delete-ey2bp/2",
-        api_key="n9ZqQYFxrPZCCverE0Lh"
-    )
+    detector = create_detector()
+    detector.warmup()
+    pending, pending_t = [], []
 
     initial_timestamp = time.perf_counter()
     object_queue = CoordQueue(threshold_t=1200)
@@ -110,7 +102,12 @@ if __name__ == '__main__':
 
             now_t = time.perf_counter() - initial_timestamp
 
-            add_song_queue(object_queue)
+            # replication isn't latency bound, so infer a few frames at a time
+            pending.append(screenshot)
+            pending_t.append(now_t)
+            if len(pending) >= DETECTOR_BATCH_SIZE:
+                add_song_queue_batch(object_queue, detector, pending, pending_t)
+                pending, pending_t = [], []
             
         # ============= FPS Counter =============
         key = cv2.waitKey(1)
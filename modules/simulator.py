@@ -0,0 +1,259 @@
+import heapq
+import itertools
+import json
+import math
+
+import numpy as np
+
+from .config import (OBJ_THRESHOLD, OBJ_COOLDOWN, OBJ_MIN_COUNT, AR_DELAY_OFFSET,
+                     SIM_DETECTOR_FPS, SIM_LATENCY_MS, SIM_LATENCY_JITTER_MS, SIM_JITTER_PX,
+                     SIM_CONFIDENCE, SIM_CONFIDENCE_NOISE, SIM_DROP_RATE, SIM_MISS_RATE,
+                     SIM_FALSE_POSITIVES, SIM_TICK_MS)
+from .coord_queue import CoordQueue, DetectionBatch, class_id, hittable
+from .hitobject_table import HitObjectTable, KIND_CIRCLE, KIND_SLIDER, KIND_SPINNER
+from .matcher import ObjectMatcher
+from .metrics import Metrics
+from .playfield import PlayfieldTransform, FakeWindowProvider
+from .read_map import prep_osu_objects
+
+
+class VirtualClock:
+    """ms clock that only moves when advanced."""
+    def __init__(self, now_ms=0.0):
+        self.now_ms = float(now_ms)
+
+    def __call__(self):
+        return self.now_ms
+
+    def advance(self, ms):
+        self.now_ms += ms
+
+
+# -------------------------------
+# Synthetic detector
+# -------------------------------
+class SyntheticDetector:
+    """
+    Fake model output for a map: at map time t every circle / slider head
+    whose approach circle is showing (time - preempt <= t < time) is
+    detected at its playfield position, with Gaussian position jitter and
+    confidence noise; each object can be missed and Poisson-distributed
+    false positives are added. Coordinates are model image pixels for a
+    full-window screenshot of the given window rect.
+    """
+    def __init__(self, table, preempt_ms, transform, rng, jitter_px=SIM_JITTER_PX,
+                 confidence=SIM_CONFIDENCE, confidence_noise=SIM_CONFIDENCE_NOISE,
+                 miss_rate=SIM_MISS_RATE, false_positives=SIM_FALSE_POSITIVES):
+        self.preempt_ms = preempt_ms
+        self.rng = rng
+        self.jitter_px = jitter_px
+        self.confidence = confidence
+        self.confidence_noise = confidence_noise
+        self.miss_rate = miss_rate
+        self.false_positives = false_positives
+
+        left, top, right, bottom = transform.client_rect()
+        self.image_w, self.image_h = right - left, bottom - top
+        shown = (table.kind == KIND_CIRCLE) | (table.kind == KIND_SLIDER)
+        self.times = np.asarray(table.time, dtype=np.float64)[shown]
+        screen = transform.osu_to_screen_batch(np.column_stack((table.x[shown], table.y[shown])))
+        self.img_x = screen[:, 0] - left
+        self.img_y = screen[:, 1] - top
+        self.class_ids = np.where(table.kind[shown] == KIND_SLIDER,
+                                  class_id("slider_head"), class_id("circle")).astype(np.int16)
+        self.circle_size = 0.1 * self.image_h
+
+    def frame(self, map_ms):
+        """DetectionBatch (time_ms 0) the model would return for a frame captured at map_ms."""
+        rng = self.rng
+        lo = np.searchsorted(self.times, map_ms, side="right")
+        hi = np.searchsorted(self.times, map_ms + self.preempt_ms, side="right")
+        idx = np.arange(lo, hi)
+        idx = idx[rng.random(len(idx)) >= self.miss_rate]
+        n_fp = rng.poisson(self.false_positives)
+        n = len(idx) + n_fp
+
+        x = np.concatenate((self.img_x[idx], rng.uniform(0, self.image_w, n_fp)))
+        y = np.concatenate((self.img_y[idx], rng.uniform(0, self.image_h, n_fp)))
+        x += rng.normal(0, self.jitter_px, n)
+        y += rng.normal(0, self.jitter_px, n)
+        cls = np.concatenate((self.class_ids[idx], np.full(n_fp, class_id("circle"), dtype=np.int16)))
+        conf = np.clip(rng.normal(self.confidence, self.confidence_noise, n), 0, 1)
+        size = np.full(n, self.circle_size)
+        return DetectionBatch(cls, conf, x, y, size, size.copy(), np.zeros(n, dtype=np.int64),
+                              self.image_w, self.image_h)
+
+
+# -------------------------------
+# Recording actions
+# -------------------------------
+class SimAction:
+    """Stands in for Circle / Slider / SpinnerAction and records when it fired."""
+    def __init__(self, sim, kind, obj, osu_pos=None):
+        self.sim = sim
+        self.kind = kind
+        self.obj = obj
+        self.index = sim.matcher.index
+        self.osu_pos = osu_pos
+        self.done = False
+        self.end_t = None if kind == KIND_CIRCLE else obj.end_time / 1000 if kind == KIND_SLIDER else obj.endTime / 1000
+
+    def update(self, t):
+        if self.index not in self.sim.fired:
+            self.sim.fired[self.index] = (t * 1000, self.osu_pos)
+        if self.end_t is None or t >= self.end_t:
+            self.done = True
+
+
+class SimActions:
+    def __init__(self, sim):
+        self.sim = sim
+
+    def circle(self, obj, coord):
+        pos = self.sim.transform.ai_to_osu_batch([(coord.x, coord.y)], coord.screen_x, coord.screen_y)[0]
+        return SimAction(self.sim, KIND_CIRCLE, obj, (float(pos[0]), float(pos[1])))
+
+    def slider(self, obj):
+        return SimAction(self.sim, KIND_SLIDER, obj)
+
+    def spinner(self, obj):
+        return SimAction(self.sim, KIND_SPINNER, obj)
+
+
+# -------------------------------
+# Simulator
+# -------------------------------
+class Simulator:
+    """
+    Deterministic offline run of detection ingestion, CoordQueue and
+    ObjectMatcher on a virtual clock, no window, model or mouse needed.
+
+    Clock 0 is the first object's hit time (it is clicked by hand in a
+    live run). Frames are captured every 1000 / detector_fps ms from one
+    approach time before that; each is dropped with drop_rate or delivered
+    latency_ms (+ |N(0, latency_jitter_ms)|) later, stamped with its
+    capture time like InferenceWorker does. The main loop runs every
+    tick_ms. Same seed and settings give the same result.
+    """
+    def __init__(self, hitobjects, ar_delay, seed=0, detector_fps=SIM_DETECTOR_FPS,
+                 latency_ms=SIM_LATENCY_MS, latency_jitter_ms=SIM_LATENCY_JITTER_MS, drop_rate=SIM_DROP_RATE,
+                 tick_ms=SIM_TICK_MS, window_rect=(0, 0, 1920, 1080), ar_offset=AR_DELAY_OFFSET, **detector_kwargs):
+        self.table = hitobjects if isinstance(hitobjects, HitObjectTable) else HitObjectTable.from_objects(hitobjects)
+        self.ar_delay = ar_delay
+        self.rng = np.random.default_rng(seed)
+        self.frame_ms = 1000.0 / detector_fps
+        self.latency_ms = latency_ms
+        self.latency_jitter_ms = latency_jitter_ms
+        self.drop_rate = drop_rate
+        self.tick_ms = tick_ms
+
+        self.transform = PlayfieldTransform(FakeWindowProvider(window_rect), refresh_interval=math.inf)
+        self.detector = SyntheticDetector(self.table, ar_delay, self.transform, self.rng, **detector_kwargs)
+        self.clock = VirtualClock()
+        self.coord_queue = CoordQueue(threshold_dist=OBJ_THRESHOLD, cooldown_time=OBJ_COOLDOWN,
+                                      min_detect_count=OBJ_MIN_COUNT, threshold_t=0, clock=self.clock)
+        self.start_ms = float(self.table.time[0])
+        self.metrics = Metrics()  # kept apart from the live pipeline's shared instance
+        self.matcher = ObjectMatcher(self.table, self.coord_queue, ar_delay - ar_offset, self.start_ms,
+                                     self.clock, actions=SimActions(self), verbose=False, metrics=self.metrics)
+        self.matcher.index = 1
+        self.fired = {}  # object index -> (map ms of first action update, clicked osu position)
+        self.frames = 0
+        self.frames_dropped = 0
+
+    def run(self):
+        clock = self.clock
+        clock.now_ms = -(self.ar_delay + self.frame_ms)
+        end_ms = float(self.table.end_time.max()) - self.start_ms + 1000
+        next_capture = clock.now_ms
+        in_flight = []  # heap of (delivery ms, n, capture ms, batch)
+        counter = itertools.count()
+
+        while clock.now_ms <= end_ms and not self.matcher.finished:
+            now = clock.now_ms
+            while next_capture <= now:
+                self.frames += 1
+                if self.rng.random() < self.drop_rate:
+                    self.frames_dropped += 1
+                else:
+                    latency = self.latency_ms + abs(self.rng.normal(0, self.latency_jitter_ms))
+                    batch = self.detector.frame(next_capture + self.start_ms)
+                    heapq.heappush(in_flight, (next_capture + latency, next(counter), next_capture, batch))
+                next_capture += self.frame_ms
+
+            # detections whose inference finished by now, oldest first
+            while in_flight and in_flight[0][0] <= now:
+                _, _, captured, batch = heapq.heappop(in_flight)
+                self.coord_queue.add_batch(hittable(batch.restamp(round(captured))))
+
+            if now >= 0:
+                self.matcher.step()
+            clock.advance(self.tick_ms)
+
+        return SimResult(self.table, self.fired, self.frames, self.frames_dropped)
+
+
+class SimResult:
+    """Per-object action time vs. true hit time (ms, positive = late)."""
+    def __init__(self, table, fired, frames, frames_dropped):
+        self.frames = frames
+        self.frames_dropped = frames_dropped
+        self.records = []
+        for i in range(1, len(table)):
+            action_ms, pos = fired.get(i, (None, None))
+            record = {"index": i, "kind": int(table.kind[i]), "time_ms": int(table.time[i]),
+                      "action_ms": None if action_ms is None else round(action_ms, 3),
+                      "error_ms": None if action_ms is None else round(action_ms - table.time[i], 3)}
+            if pos is not None:
+                record["pos_error_px"] = round(math.hypot(pos[0] - table.x[i], pos[1] - table.y[i]), 3)
+            self.records.append(record)
+
+    def summary(self):
+        def stats(records):
+            err = np.array([r["error_ms"] for r in records if r["error_ms"] is not None], dtype=np.float64)
+            out = {"objects": len(records), "actioned": len(err)}
+            if len(err):
+                abs_err = np.abs(err)
+                out.update(mean_ms=round(float(err.mean()), 3), abs_mean_ms=round(float(abs_err.mean()), 3),
+                           p50_ms=round(float(np.percentile(abs_err, 50)), 3),
+                           p95_ms=round(float(np.percentile(abs_err, 95)), 3),
+                           max_ms=round(float(abs_err.max()), 3))
+            return out
+
+        by_kind = {name: stats([r for r in self.records if r["kind"] == kind])
+                   for name, kind in (("circle", KIND_CIRCLE), ("slider", KIND_SLIDER), ("spinner", KIND_SPINNER))}
+        return {"frames": self.frames, "frames_dropped": self.frames_dropped,
+                "all": stats(self.records), **by_kind}
+
+
+def simulate(song_path, **kwargs):
+    """Parse a .osu file and run a Simulator on it."""
+    hitobjects, _, _, _, ar_delay = prep_osu_objects(song_path)
+    return Simulator(hitobjects, ar_delay, **kwargs).run()
+
+
+if __name__ == "__main__":
+    # python -m modules.simulator test_songs/cin_normal.osu --seed 1 --latency 80
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Offline matching-loop simulation for a .osu file")
+    parser.add_argument("song_path")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fps", type=float, default=SIM_DETECTOR_FPS, dest="detector_fps")
+    parser.add_argument("--latency", type=float, default=SIM_LATENCY_MS, dest="latency_ms")
+    parser.add_argument("--latency-jitter", type=float, default=SIM_LATENCY_JITTER_MS, dest="latency_jitter_ms")
+    parser.add_argument("--drop", type=float, default=SIM_DROP_RATE, dest="drop_rate")
+    parser.add_argument("--miss", type=float, default=SIM_MISS_RATE, dest="miss_rate")
+    parser.add_argument("--false-positives", type=float, default=SIM_FALSE_POSITIVES)
+    parser.add_argument("--jitter", type=float, default=SIM_JITTER_PX, dest="jitter_px")
+    parser.add_argument("--confidence-noise", type=float, default=SIM_CONFIDENCE_NOISE)
+    parser.add_argument("--tick", type=float, default=SIM_TICK_MS, dest="tick_ms")
+    parser.add_argument("--records", help="write per-object records to this JSON file")
+    args = vars(parser.parse_args())
+
+    records_path = args.pop("records")
+    result = simulate(args.pop("song_path"), **args)
+    print(json.dumps(result.summary(), indent=2))
+    if records_path:
+        with open(records_path, "w") as f:
+            json.dump(result.records, f, indent=1)
@@ -1,10 +1,19 @@
 import bisect
 import math
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
 
 def point_at_progress(pts, dists, p):
-    """p in [0,1] -> returns point at arc-length progress p"""
-    if not pts:
-        return (0,0)
+    """
+    p in [0,1] -> returns point at arc-length progress p. Scalar path, run
+    per cursor tick: pass plain lists (SliderPathCache.get_lists), bisect
+    on NumPy arrays is several times slower.
+    """
+    if len(pts) == 0:
+        return (0, 0)
     target = dists[-1] * p
     i = bisect.bisect_left(dists, target)
     if i == 0:
@@ -17,85 +26,318 @@ def point_at_progress(pts, dists, p):
     y = pts[i-1][1] + (pts[i][1] - pts[i-1][1]) * frac
     return x, y
 
-def sample_polyline(poly_pts, n_per_segment=8):
+def points_at_progress(pts, dists, p):
     """
-    Produces sampled points and cumulative distances for a polyline defined
-    by poly_pts = [(x0,y0), (x1,y1), ..., (xn,yn)].
-    n_per_segment controls smoothness per straight segment.
+    Batch point_at_progress: p is an array of progress values in [0,1],
+    returns an (n, 2) array of positions (one searchsorted + interpolation pass).
     """
-    if len(poly_pts) == 0:
-        return [], [0.0]
-    samples = []
-    dists = [0.0]
-
-    # start with the first point
-    samples.append(poly_pts[0])
-
-    for i in range(len(poly_pts)-1):
-        a = poly_pts[i]
-        b = poly_pts[i+1]
-        # sample the segment excluding the first endpoint (already added)
-        for s in range(1, n_per_segment+1):
-            t = s / (n_per_segment + 0)  # s/(n) gives n samples including endpoint
-            x = a[0] + (b[0] - a[0]) * t
-            y = a[1] + (b[1] - a[1]) * t
-            samples.append((x,y))
-            # compute cumulative dist
-            prev = samples[-2]
-            segd = math.hypot(x - prev[0], y - prev[1])
-            dists.append(dists[-1] + segd)
-
-    return samples, dists
-
-def bezier_point(points, t):
-    """Evaluate Bezier curve of any degree using De Casteljau."""
-    pts = list(points)
-    n = len(pts)
-    for r in range(1, n):
-        for i in range(n - r):
-            x = (1-t)*pts[i][0] + t*pts[i+1][0]
-            y = (1-t)*pts[i][1] + t*pts[i+1][1]
-            pts[i] = (x, y)
-    return pts[0]
-
-def sample_curve(eval_fn, n=250):
-    pts = [eval_fn(i/(n-1)) for i in range(n)]
-    dists = [0.0]
-    for i in range(1, n):
-        dx = pts[i][0] - pts[i-1][0]
-        dy = pts[i][1] - pts[i-1][1]
-        dists.append(dists[-1] + math.hypot(dx, dy))
-    return pts, dists
+    pts = np.asarray(pts, dtype=np.float64)
+    dists = np.asarray(dists, dtype=np.float64)
+    p = np.asarray(p, dtype=np.float64)
+    if len(pts) == 0:
+        return np.zeros((len(p), 2))
+    if len(pts) == 1:
+        return np.repeat(pts, len(p), axis=0)
+
+    target = dists[-1] * p
+    i = np.clip(np.searchsorted(dists, target, side="left"), 1, len(pts) - 1)
+    a, b = dists[i - 1], dists[i]
+    span = b - a
+    frac = np.divide(target - a, span, out=np.zeros_like(target), where=span > 0)
+    frac = np.clip(frac, 0.0, 1.0)
+    return pts[i - 1] + (pts[i] - pts[i - 1]) * frac[:, None]
+
+def slide_progress(progress_raw, slides):
+    """
+    Fold overall slider progress [0,1] into path progress, reversing
+    direction on every other slide (scalar version, plain floats).
+    """
+    # comparisons instead of max() / min(): this runs on every cursor tick
+    if progress_raw < 0.0:
+        progress_raw = 0.0
+    elif progress_raw > 1.0:
+        progress_raw = 1.0
+    total = progress_raw * slides
+    slide_index = int(total)
+    slide_pos = total - slide_index
+    return slide_pos if slide_index % 2 == 0 else 1.0 - slide_pos
 
-def scale_samples_to_length(samples, dists, target_length):
+def slide_progresses(progress_raw, slides):
+    """Array version of slide_progress()."""
+    total = np.clip(progress_raw, 0.0, 1.0) * slides
+    slide_index = np.floor(total)
+    slide_pos = total - slide_index
+    return np.where(slide_index % 2 == 0, slide_pos, 1.0 - slide_pos)
+
+def slider_positions(pts, dists, times_ms, start_ms, duration_ms, slides):
+    """Path positions of a slider at each timestamp in times_ms (ms, same clock as start_ms)."""
+    times_ms = np.asarray(times_ms, dtype=np.float64)
+    if duration_ms > 0:
+        progress_raw = (times_ms - start_ms) / duration_ms
+    else:
+        progress_raw = np.where(times_ms >= start_ms, 1.0, 0.0)
+    return points_at_progress(pts, dists, slide_progresses(progress_raw, slides))
+
+# -------------------------------
+# Vectorized path engine
+# -------------------------------
+PATH_TOLERANCE = 0.25   # max distance (osu px) between the curve and its sampled chords
+PATH_MAX_PIECES = 1024  # cap on chords per Bezier segment (degenerate control points)
+
+
+@lru_cache(maxsize=64)
+def _binomials(degree):
+    return np.array([math.comb(degree, k) for k in range(degree + 1)], dtype=np.float64)
+
+def bernstein_basis(degree, t):
+    """(len(t), degree+1) matrix B with B[i, k] = C(degree, k) * t_i^k * (1-t_i)^(degree-k)."""
+    t = np.asarray(t, dtype=np.float64)[:, None]
+    k = np.arange(degree + 1)[None, :]
+    return _binomials(degree) * t ** k * (1.0 - t) ** (degree - k)
+
+@lru_cache(maxsize=512)
+def uniform_basis(degree, pieces):
+    """bernstein_basis at pieces + 1 evenly spaced t, cached per (degree, pieces) and read-only."""
+    basis = bernstein_basis(degree, np.linspace(0.0, 1.0, pieces + 1))
+    basis.flags.writeable = False
+    return basis
+
+def bezier_samples(cp, t):
+    """Evaluate a single Bezier segment at the parameter values t."""
+    cp = np.asarray(cp, dtype=np.float64)
+    if len(cp) == 1:
+        return np.repeat(cp, len(t), axis=0)
+    return bernstein_basis(len(cp) - 1, t) @ cp
+
+def flat_pieces(cp, tolerance=PATH_TOLERANCE):
+    """
+    Wang's formula: how many uniform pieces in t keep every chord of the
+    Bezier segment(s) cp (shape (..., degree+1, 2)) within tolerance of the
+    curve. One bound from the control points, no trial evaluations.
+    """
+    cp = np.asarray(cp, dtype=np.float64)
+    degree = cp.shape[-2] - 1
+    if degree < 2:
+        return 1
+    second = np.hypot(*np.moveaxis(np.diff(cp, n=2, axis=-2), -1, 0)).max()
+    pieces = math.ceil(math.sqrt(degree * (degree - 1) * second / (8 * tolerance)))
+    return min(max(pieces, 1), PATH_MAX_PIECES)
+
+def split_bezier_segments(cp):
+    """Split control points at repeated anchors (osu! "red" points) into separate Bezier segments."""
+    cp = np.asarray(cp, dtype=np.float64)
+    if len(cp) < 2:
+        return [cp]
+    repeated = np.flatnonzero(np.all(cp[1:] == cp[:-1], axis=1)) + 1
+    segments = np.split(cp, repeated)
+    return [seg for seg in segments if len(seg) > 1] or [cp[:1]]
+
+def _join(parts):
+    # drop the duplicated first point of every following piece
+    return np.concatenate([parts[0]] + [p[1:] for p in parts[1:]])
+
+def bezier_path(cp, tolerance=PATH_TOLERANCE):
+    parts = []
+    for seg in split_bezier_segments(cp):
+        if len(seg) <= 2:
+            parts.append(seg)  # straight piece, endpoints are exact
+            continue
+        parts.append(uniform_basis(len(seg) - 1, flat_pieces(seg, tolerance)) @ seg)
+    return _join(parts)
+
+def linear_path(cp):
+    # straight segments are exact, point_at_progress interpolates in between
+    return np.asarray(cp, dtype=np.float64)
+
+def circle_arc_path(cp, tolerance=PATH_TOLERANCE):
+    """Perfect-circle slider through 3 points. Falls back to Bezier like osu! does."""
+    cp = np.asarray(cp, dtype=np.float64)
+    if len(cp) != 3:
+        return bezier_path(cp, tolerance)
+    (ax, ay), (bx, by), (cx, cy) = cp
+    d = 2 * (ax * (by - cy) + bx * (cy - ay) + cx * (ay - by))
+    if abs(d) < 1e-6:
+        # collinear points, no circle through them
+        return bezier_path(cp, tolerance)
+
+    a2, b2, c2 = ax*ax + ay*ay, bx*bx + by*by, cx*cx + cy*cy
+    ox = (a2 * (by - cy) + b2 * (cy - ay) + c2 * (ay - by)) / d
+    oy = (a2 * (cx - bx) + b2 * (ax - cx) + c2 * (bx - ax)) / d
+    r = math.hypot(ax - ox, ay - oy)
+
+    theta_start = math.atan2(ay - oy, ax - ox)
+    theta_end = math.atan2(cy - oy, cx - ox)
+    # direction from the sign of the triangle's orientation
+    clockwise = (bx - ax) * (cy - ay) - (by - ay) * (cx - ax) < 0
+    if clockwise:
+        while theta_end > theta_start:
+            theta_end -= 2 * math.pi
+    else:
+        while theta_end < theta_start:
+            theta_end += 2 * math.pi
+
+    # chord count that keeps the sagitta r * (1 - cos(step / 2)) under tolerance
+    sweep = abs(theta_end - theta_start)
+    max_step = 2 * math.acos(max(-1.0, 1 - tolerance / r)) if r > tolerance else math.pi
+    n = max(2, int(math.ceil(sweep / max_step)) + 1)
+
+    theta = np.linspace(theta_start, theta_end, n)
+    return np.column_stack((ox + r * np.cos(theta), oy + r * np.sin(theta)))
+
+def catmull_path(cp, tolerance=PATH_TOLERANCE):
+    """Uniform Catmull-Rom through the control points (osu! "C" sliders)."""
+    cp = np.asarray(cp, dtype=np.float64)
+    if len(cp) < 2:
+        return cp
+    # phantom end points so the curve passes through the first and last point
+    padded = np.vstack((cp[:1], cp, 2 * cp[-1:] - cp[-2:-1]))
+
+    # every span as a cubic Bezier (k, 4, 2), then all of them with one basis
+    v1, v2, v3, v4 = padded[:-3], padded[1:-2], padded[2:-1], padded[3:]
+    beziers = np.stack((v2, v2 + (v3 - v1) / 6, v3 - (v4 - v2) / 6, v3), axis=1)
+    basis = uniform_basis(3, flat_pieces(beziers, tolerance))
+    spans = np.einsum("tk,ski->sti", basis, beziers)
+    return np.concatenate((spans[0], spans[1:, 1:].reshape(-1, 2)))
+
+def cumulative_dists(pts):
+    dists = np.zeros(len(pts))
+    if len(pts) > 1:
+        np.cumsum(np.hypot(*np.diff(pts, axis=0).T), out=dists[1:])
+    return dists
+
+def clip_to_length(pts, dists, target_length):
+    """
+    Cut (or extend along the last segment) the path so it is exactly
+    target_length long, the way osu! treats a slider's pixel length.
+    """
+    if len(pts) < 2 or target_length <= 0:
+        return pts, dists
     total = dists[-1]
-    if total <= 0 or target_length <= 0:
-        return samples, dists  # nothing to do
-
-    scale = target_length / total
-    # translate relative to first sample, scale vector, then shift back
-    x0, y0 = samples[0]
-    scaled = []
-    for (x, y) in samples:
-        vx = x - x0
-        vy = y - y0
-        scaled.append((x0 + vx * scale, y0 + vy * scale))
-    # scaled dists = old dists * scale
-    scaled_dists = [d * scale for d in dists]
-    return scaled, scaled_dists
+    if total > target_length:
+        i = int(np.searchsorted(dists, target_length))
+        a, b = dists[i - 1], dists[i]
+        frac = (target_length - a) / (b - a) if b > a else 0.0
+        end = pts[i - 1] + (pts[i] - pts[i - 1]) * frac
+        pts = np.vstack((pts[:i], end))
+        dists = np.append(dists[:i], target_length)
+    elif total < target_length:
+        direction = pts[-1] - pts[-2]
+        seg = math.hypot(*direction)
+        if seg > 0:
+            end = pts[-1] + direction / seg * (target_length - total)
+            pts = np.vstack((pts, end))
+            dists = np.append(dists, target_length)
+    return pts, dists
 
-def point_at_progress(pts, dists, p):
-    target = dists[-1] * p
-    i = bisect.bisect_left(dists, target)
-    if i == 0:
-        return pts[0]
-    if i >= len(pts):
-        return pts[-1]
-    a, b = dists[i-1], dists[i]
-    frac = (target - a) / (b - a) if b > a else 0
-    x = pts[i-1][0] + (pts[i][0] - pts[i-1][0]) * frac
-    y = pts[i-1][1] + (pts[i][1] - pts[i-1][1]) * frac
-    return x, y
+def slider_path(curve_type, cp, length=None, tolerance=PATH_TOLERANCE):
+    """
+    Sample a slider path to within tolerance osu px. cp includes the slider head.
+    Returns (pts, dists): (n, 2) float array and cumulative arc length.
+    """
+    if curve_type == "L":
+        pts = linear_path(cp)
+    elif curve_type == "P":
+        pts = circle_arc_path(cp, tolerance)
+    elif curve_type == "C":
+        pts = catmull_path(cp, tolerance)
+    else:
+        # "B" and anything unknown
+        pts = bezier_path(cp, tolerance)
+
+    dists = cumulative_dists(pts)
+    if length is not None:
+        pts, dists = clip_to_length(pts, dists, length)
+    return pts, dists
+
+# -------------------------------
+# Slider path cache
+# -------------------------------
+def slider_path_key(obj):
+    return (obj.curveType, (obj.x, obj.y), tuple(obj.points), obj.length)
+
+def _build_slider_path(key):
+    curve_type, head, points, length = key
+    return slider_path(curve_type, [head] + list(points), length)
+
+
+class SliderPathCache:
+    """
+    Sampled paths (pts, dists) keyed by a slider's curve definition.
+
+    precompute() fills the cache at map load, either inline, in a
+    background thread or in a process pool, so building a SliderAction
+    is only a dict lookup. get() still builds a missing path on the spot.
+    get_lists() gives the same path as plain lists, for point_at_progress.
+    """
+    def __init__(self):
+        self.paths = {}
+        self.lists = {}
+        self._thread = None
+
+    def get(self, obj):
+        key = slider_path_key(obj)
+        path = self.paths.get(key)
+        if path is None:
+            path = _build_slider_path(key)
+            self.paths[key] = path
+        return path
+
+    def get_lists(self, obj):
+        key = slider_path_key(obj)
+        path = self.lists.get(key)
+        if path is None:
+            pts, dists = self.get(obj)
+            path = ([tuple(p) for p in pts.tolist()], dists.tolist())
+            self.lists[key] = path
+        return path
+
+    def _missing_keys(self, hitobjects):
+        keys = []
+        for obj in hitobjects:
+            if getattr(obj, "curveType", None) is None:
+                continue
+            key = slider_path_key(obj)
+            if key not in self.paths:
+                keys.append(key)
+        return list(dict.fromkeys(keys))
+
+    def _fill(self, keys):
+        for key in keys:
+            if key not in self.paths:
+                self.paths[key] = _build_slider_path(key)
+
+    def precompute(self, hitobjects, mode="sync", workers=None):
+        """
+        Build paths for every slider in hitobjects.
+        mode: "sync" (block until done), "thread" (background thread, returns
+        immediately) or "process" (process pool, blocks until done).
+        """
+        keys = self._missing_keys(hitobjects)
+        if not keys:
+            return
+
+        if mode == "thread":
+            self._thread = threading.Thread(target=self._fill, args=(keys,), daemon=True)
+            self._thread.start()
+        elif mode == "process":
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                for key, path in zip(keys, pool.map(_build_slider_path, keys, chunksize=32)):
+                    self.paths[key] = path
+        else:
+            self._fill(keys)
+
+    def wait(self, timeout=None):
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def clear(self):
+        self.paths.clear()
+
+    def __len__(self):
+        return len(self.paths)
+
+
+slider_paths = SliderPathCache()
 
 if __name__ == "__main__":
      
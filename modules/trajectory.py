@@ -0,0 +1,156 @@
+import math
+
+import numpy as np
+
+from .config import TRAJECTORY_RATE_HZ, CLICK_HOLD_MS, SPINNER_RPM, SPINNER_RADIUS
+from .hitobject_table import HitObjectTable, KIND_SLIDER, KIND_SPINNER
+from .slidercalculation import slider_paths, slider_positions, slide_progress, points_at_progress
+
+BUTTON_UP = 0
+BUTTON_DOWN = 1
+
+
+class TrajectoryPlan:
+    """
+    Time-sorted cursor/button plan for a whole map, sampled every step_ms
+    starting at t0_ms. samples[i] = (t_ms, osu_x, osu_y, button).
+    Looking up a time is a single index computation.
+    """
+    def __init__(self, t0_ms, step_ms, x, y, button):
+        self.t0_ms = float(t0_ms)
+        self.step_ms = float(step_ms)
+        self.x = x
+        self.y = y
+        self.button = button
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def t_ms(self):
+        return self.t0_ms + np.arange(len(self)) * self.step_ms
+
+    @property
+    def samples(self):
+        return np.column_stack((self.t_ms, self.x, self.y, self.button))
+
+    def index(self, t_ms):
+        i = int((t_ms - self.t0_ms) / self.step_ms)
+        return min(max(i, 0), len(self) - 1)
+
+    def indices(self, t_ms):
+        """Vectorized index() for an array of times."""
+        i = ((np.asarray(t_ms, dtype=np.float64) - self.t0_ms) / self.step_ms).astype(np.int64)
+        return np.clip(i, 0, len(self) - 1)
+
+    def span(self, start_ms, end_ms):
+        """(first, last) index of the samples inside [start_ms, end_ms]."""
+        first = int(math.ceil((start_ms - self.t0_ms) / self.step_ms))
+        last = int(math.floor((end_ms - self.t0_ms) / self.step_ms))
+        return max(first, 0), min(last, len(self) - 1)
+
+    def at(self, t_ms, first=0, last=None):
+        """
+        (osu_x, osu_y, button) planned for time t_ms. first / last (from
+        span()) keep the lookup on one object's samples at its edges.
+        """
+        # called every cursor tick: plain scalar arithmetic, no NumPy dispatch
+        i = int((t_ms - self.t0_ms) / self.step_ms)
+        if last is None:
+            last = len(self.x) - 1
+        i = first if i < first else last if i > last else i
+        return self.x.item(i), self.y.item(i), int(self.button.item(i))
+
+    # -------------------------------
+    # Persistence
+    # -------------------------------
+    def save(self, path):
+        np.save(path, self.samples)
+
+    @classmethod
+    def load(cls, path, mmap_mode="r"):
+        # plain ndarray view of the mapping: indexing an np.memmap goes through Python code
+        samples = np.asarray(np.load(path, mmap_mode=mmap_mode))
+        step_ms = float(samples[1, 0] - samples[0, 0]) if len(samples) > 1 else 1.0
+        return cls(samples[0, 0], step_ms, samples[:, 1], samples[:, 2], samples[:, 3])
+
+    # -------------------------------
+    # Offline comparison
+    # -------------------------------
+    def compare(self, other):
+        """Differences against another plan over the overlapping time range."""
+        t = self.t_ms
+        t = t[(t >= other.t0_ms) & (t <= other.t0_ms + (len(other) - 1) * other.step_ms)]
+        if not len(t):
+            return {"samples": 0}
+        a = self.indices(t)
+        b = other.indices(t)
+        dist = np.hypot(self.x[a] - other.x[b], self.y[a] - other.y[b])
+        return {
+            "samples": len(t),
+            "max_dist": float(dist.max()),
+            "mean_dist": float(dist.mean()),
+            "button_mismatch": int(np.count_nonzero(self.button[a] != other.button[b])),
+        }
+
+
+def compile_trajectory(hitobjects, rate_hz=TRAJECTORY_RATE_HZ, click_ms=CLICK_HOLD_MS,
+                       spinner_rpm=SPINNER_RPM, spinner_radius=SPINNER_RADIUS):
+    """
+    Compile what CircleAction / SliderAction / SpinnerAction would do over
+    the whole map into a TrajectoryPlan (osu! pixel coordinates, map time).
+    Between objects the cursor stays where the previous object ended.
+    """
+    table = hitobjects if isinstance(hitobjects, HitObjectTable) else HitObjectTable.from_objects(hitobjects)
+    step_ms = 1000.0 / rate_hz
+    if len(table) == 0:
+        return TrajectoryPlan(0, step_ms, np.zeros(0), np.zeros(0), np.zeros(0, dtype=np.uint8))
+
+    starts = np.asarray(table.time, dtype=np.float64)
+    ends = np.maximum(np.asarray(table.end_time, dtype=np.float64), starts + click_ms)
+    t0 = starts[0]
+    n = int(math.ceil((ends.max() - t0) / step_ms)) + 1
+    t = t0 + np.arange(n) * step_ms
+
+    # where the cursor rests after each object (slider end depends on slide count)
+    rest_x = np.asarray(table.x, dtype=np.float64).copy()
+    rest_y = np.asarray(table.y, dtype=np.float64).copy()
+
+    button = np.zeros(n, dtype=np.uint8)
+    x = np.empty(n)
+    y = np.empty(n)
+
+    def span(start_ms, end_ms):
+        return (int(math.ceil((start_ms - t0) / step_ms)),
+                min(n, int(math.floor((end_ms - t0) / step_ms)) + 1))
+
+    # objects with their own movement
+    moving = []
+    for i in np.flatnonzero(table.kind != 0):
+        kind = table.kind[i]
+        lo, hi = span(starts[i], ends[i])
+        if kind == KIND_SLIDER:
+            pts, dists = slider_paths.get(table[i])
+            end = points_at_progress(pts, dists, [slide_progress(1.0, int(table.slides[i]))])[0]
+            rest_x[i], rest_y[i] = end
+            moving.append((i, kind, lo, hi, pts, dists))
+        elif kind == KIND_SPINNER:
+            moving.append((i, kind, lo, hi, None, None))
+        button[lo:hi] = BUTTON_DOWN
+
+    # resting position = last object started at or before t
+    active = np.clip(np.searchsorted(starts, t, side="right") - 1, 0, len(table) - 1)
+    x[:] = rest_x[active]
+    y[:] = rest_y[active]
+
+    for i, kind, lo, hi, pts, dists in moving:
+        ts = t[lo:hi]
+        if kind == KIND_SLIDER:
+            pos = slider_positions(pts, dists, ts, starts[i], table.duration_ms[i], table.slides[i])
+            x[lo:hi], y[lo:hi] = pos[:, 0], pos[:, 1]
+        else:
+            angle = 2 * math.pi * spinner_rpm / 60000.0 * (ts - starts[i])
+            x[lo:hi] = table.x[i] + spinner_radius * np.cos(angle)
+            y[lo:hi] = table.y[i] + spinner_radius * np.sin(angle)
+
+    return TrajectoryPlan(t0, step_ms, x, y, button)
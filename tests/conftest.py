@@ -0,0 +1,9 @@
+import os
+import sys
+
+# the repo is not installed as a package: make `modules` importable from any cwd
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+SONGS_DIR = os.path.join(ROOT, "test_songs")
@@ -0,0 +1,108 @@
+import numpy as np
+
+from modules.coord_queue import CoordQueue, DataAI, DetectionBatch, class_id
+from modules.simulator import VirtualClock
+
+
+def coord(x, y, time_ms, cls="circle"):
+    return DataAI.from_values(cls, float(x), float(y), 40.0, 40.0, time_ms, 1920, 1080)
+
+
+def make_queue(min_detect_count=1, cooldown_time=0.2, threshold_t=0):
+    clock = VirtualClock()
+    return CoordQueue(threshold_dist=25, cooldown_time=cooldown_time, min_detect_count=min_detect_count,
+                      threshold_t=threshold_t, clock=clock), clock
+
+
+def test_add_rejects_queued_position():
+    queue, _ = make_queue()
+    assert queue.add(coord(100, 100, 10))
+    assert not queue.add(coord(110, 105, 20))  # within threshold_dist of a queued coord
+    assert not queue.add(coord(105, 100, 30, cls="slider_head"))  # any class
+    assert queue.add(coord(300, 300, 40))
+    assert [(c.x, c.y) for c in queue.queue] == [(100, 100), (300, 300)]
+
+
+def test_add_rejects_queued_time():
+    queue, _ = make_queue(threshold_t=50)
+    assert queue.add(coord(100, 100, 100))
+    assert not queue.add(coord(400, 400, 140))
+    assert queue.add(coord(400, 400, 151))
+
+
+def test_add_needs_min_detect_count():
+    queue, _ = make_queue(min_detect_count=3)
+    assert not queue.add(coord(100, 100, 10))
+    assert not queue.add(coord(102, 101, 20))
+    assert queue.add(coord(101, 99, 30))
+    assert len(queue.queue) == 1
+
+
+def test_remove_and_cooldown():
+    queue, clock = make_queue(cooldown_time=0.2)
+    queue.add(coord(100, 100, 10))
+
+    assert queue.remove(coord(100, 100, 0, cls="slider_head")) is False  # class must match
+    removed = queue.remove(coord(104, 97, 0))
+    assert (removed.x, removed.y) == (100, 100)
+    assert queue.queue == []
+    assert queue.remove(coord(100, 100, 0)) is False
+
+    # the removed spot is cooling down for cooldown_time, for its class only
+    clock.advance(100)
+    assert not queue.add(coord(100, 100, 20))
+    assert queue.add(coord(100, 100, 30, cls="slider_head"))
+    queue.remove(coord(100, 100, 0, cls="slider_head"))
+    clock.advance(101)  # past the circle's cooldown, not the slider head's
+    assert queue.add(coord(100, 100, 40, cls="slider_head")) is False
+    assert queue.add(coord(100, 100, 50))
+
+
+def test_remove_takes_oldest_match():
+    queue, _ = make_queue()
+    # queued coords are more than threshold_dist apart, the removal point is near both
+    for c in (coord(100, 100, 300), coord(130, 100, 100)):
+        assert queue.add(c)
+    removed = queue.remove(coord(115, 100, 0))
+    assert removed.time_ms == 100
+
+
+def test_peek_ready_is_oldest_first():
+    queue, _ = make_queue()
+    for x, t in ((100, 300), (200, 100), (300, 200)):
+        assert queue.add(coord(x, 100, t))
+    assert [c.time_ms for c in queue.queue] == [100, 200, 300]
+
+    assert queue.peek_ready(150, 100) is None  # oldest is only 50 ms old
+    ready = queue.peek_ready(200, 100)
+    assert ready.time_ms == 100
+    assert queue.peek_ready(200, 100) is ready  # peeking doesn't consume
+
+    queue.remove(ready)
+    assert queue.peek_ready(1000, 100).time_ms == 200
+    queue.remove(queue.peek_ready(1000, 100))
+    assert queue.peek_ready(1000, 100).time_ms == 300
+    queue.remove(queue.peek_ready(1000, 100))
+    assert queue.peek_ready(1000, 100) is None
+
+
+def test_add_batch_matches_add():
+    rng = np.random.default_rng(0)
+    batched, clock_a = make_queue(min_detect_count=2)
+    single, clock_b = make_queue(min_detect_count=2)
+    circle = class_id("circle")
+    for frame in range(60):
+        n = 6
+        batch = DetectionBatch(np.full(n, circle, dtype=np.int16), np.full(n, 0.9),
+                               rng.integers(0, 8, n) * 60.0 + rng.normal(0, 2, n),
+                               rng.integers(0, 5, n) * 60.0 + rng.normal(0, 2, n),
+                               np.full(n, 40.0), np.full(n, 40.0),
+                               np.full(n, frame * 33, dtype=np.int64), 1920, 1080)
+        added = batched.add_batch(batch)
+        assert added == sum(single.add(c) for c in batch)
+        for queue, clock in ((batched, clock_a), (single, clock_b)):
+            ready = queue.peek_ready(frame * 33, 100)
+            if ready is not None:
+                queue.remove(ready)
+            clock.advance(33)
+        assert [(c.x, c.y, c.time_ms) for c in batched.queue] == [(c.x, c.y, c.time_ms) for c in single.queue]
@@ -0,0 +1,87 @@
+import threading
+
+from modules.metrics import Metrics
+from modules.scheduler import Scheduler
+from modules.simulator import VirtualClock
+
+
+def make_scheduler():
+    clock = VirtualClock()
+    return Scheduler(clock=clock, metrics=Metrics()), clock
+
+
+def test_call_every_fires_on_grid():
+    scheduler, clock = make_scheduler()
+    fired = []
+    scheduler.call_every(10, lambda: fired.append(clock()), "tick", first_ms=0)
+    for _ in range(5):
+        scheduler.run_pending()
+        clock.advance(10)
+    assert fired == [0, 10, 20, 30, 40]
+
+
+def test_cancel_call_every_handle():
+    scheduler, clock = make_scheduler()
+    fired = []
+    handle = scheduler.call_every(10, lambda: fired.append(clock()), "tick", first_ms=0)
+    scheduler.run_pending()
+    clock.advance(10)
+    scheduler.run_pending()
+    # the handle returned by call_every still cancels after it has fired
+    scheduler.cancel(handle)
+    for _ in range(3):
+        clock.advance(10)
+        scheduler.run_pending()
+    assert fired == [0, 10]
+    assert scheduler.next_deadline() is None
+
+
+def test_cancel_from_callback():
+    scheduler, clock = make_scheduler()
+    fired = []
+    handle = [None]
+
+    def tick():
+        fired.append(clock())
+        if len(fired) == 3:
+            scheduler.cancel(handle[0])
+
+    handle[0] = scheduler.call_every(10, tick, "tick", first_ms=0)
+    for _ in range(6):
+        scheduler.run_pending()
+        clock.advance(10)
+    assert fired == [0, 10, 20]
+
+
+def test_cancel_one_of_several():
+    scheduler, clock = make_scheduler()
+    fired = []
+    a = scheduler.call_every(10, lambda: fired.append("a"), "a", first_ms=0)
+    scheduler.call_every(10, lambda: fired.append("b"), "b", first_ms=5)
+    scheduler.run_pending()
+    scheduler.cancel(a)
+    for _ in range(4):
+        clock.advance(5)
+        scheduler.run_pending()
+    assert fired == ["a", "b", "b"]
+
+
+def test_cancel_while_running():
+    # real clock: a cancelled periodic event stops firing and run() keeps serving others
+    scheduler = Scheduler(metrics=Metrics())
+    ticks = []
+    handle = scheduler.call_every(1, lambda: ticks.append(1), "tick", precise=False)
+
+    def cancel():
+        scheduler.cancel(handle)
+        count = len(ticks)
+        scheduler.call_later(20, lambda: (ticks.append(count), scheduler.stop()), "check", precise=False)
+
+    scheduler.call_later(20, cancel, "cancel", precise=False)
+    thread = threading.Thread(target=scheduler.run)
+    thread.start()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert len(ticks) >= 2
+    # nothing ticked between the cancel and the check
+    assert ticks[-1] == len(ticks) - 1
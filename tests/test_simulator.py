@@ -0,0 +1,23 @@
+import os
+
+from conftest import SONGS_DIR
+from modules.read_map import prep_osu_objects
+from modules.simulator import Simulator
+
+SONG = os.path.join(SONGS_DIR, "thai.osu")
+
+
+def run(seed):
+    hitobjects, _, _, _, ar_delay = prep_osu_objects(SONG)
+    return Simulator(hitobjects, ar_delay, seed=seed).run()
+
+
+def test_same_seed_same_result():
+    a, b = run(7), run(7)
+    assert a.records == b.records
+    assert a.summary() == b.summary()
+    assert (a.frames, a.frames_dropped) == (b.frames, b.frames_dropped)
+
+
+def test_seed_changes_result():
+    assert run(7).records != run(8).records
@@ -0,0 +1,78 @@
+import math
+
+import numpy as np
+import pytest
+
+from modules.slidercalculation import PATH_TOLERANCE, bezier_samples, slider_path
+
+
+def dense_length(points):
+    return float(np.hypot(*np.diff(points, axis=0).T).sum())
+
+
+def check_path(pts, dists, start, end, length):
+    assert len(pts) == len(dists)
+    assert np.allclose(pts[0], start)
+    assert np.allclose(pts[-1], end, atol=1e-6)
+    assert dists[0] == 0
+    assert np.all(np.diff(dists) >= 0)
+    assert dists[-1] == pytest.approx(length, abs=1e-6)
+    # dists is the arc length of pts
+    assert dists[-1] == pytest.approx(dense_length(pts), abs=1e-6)
+
+
+def test_linear():
+    cp = [(0, 0), (100, 0), (100, 50)]
+    check_path(*slider_path("L", cp), (0, 0), (100, 50), 150)
+    # pixel length cuts the path...
+    check_path(*slider_path("L", cp, 120), (0, 0), (100, 20), 120)
+    # ...or extends the last segment
+    check_path(*slider_path("L", cp, 170), (0, 0), (100, 70), 170)
+
+
+def test_perfect_circle():
+    cp = [(100, 0), (0, 100), (-100, 0)]  # half circle, radius 100 around the origin
+    pts, dists = slider_path("P", cp)
+    check_path(pts, dists, (100, 0), (-100, 0), dists[-1])
+    # chords stay within tolerance of the arc, so the length is just under pi * r
+    assert math.pi * 100 - 2 * PATH_TOLERANCE < dists[-1] <= math.pi * 100
+    assert np.allclose(np.hypot(pts[:, 0], pts[:, 1]), 100)
+
+    end = (100 * math.cos(math.pi / 2), 100 * math.sin(math.pi / 2))
+    pts, dists = slider_path("P", cp, math.pi * 50)
+    assert dists[-1] == pytest.approx(math.pi * 50)
+    assert np.allclose(pts[-1], end, atol=PATH_TOLERANCE)
+
+
+def test_bezier():
+    cp = [(0, 0), (50, 200), (200, 200), (250, 0)]
+    reference = bezier_samples(np.asarray(cp, dtype=np.float64), np.linspace(0, 1, 100001))
+    pts, dists = slider_path("B", cp)
+    check_path(pts, dists, (0, 0), (250, 0), dists[-1])
+    assert dists[-1] == pytest.approx(dense_length(reference), abs=1.0)
+
+    # cut to a pixel length: the end stays on the curve
+    pts, dists = slider_path("B", cp, 200)
+    assert dists[-1] == pytest.approx(200)
+    assert np.allclose(pts[0], (0, 0))
+    assert np.hypot(*(reference - pts[-1]).T).min() <= PATH_TOLERANCE
+
+
+def test_bezier_segments():
+    # a repeated control point starts a new segment (red anchor)
+    cp = [(0, 0), (100, 0), (100, 0), (100, 100)]
+    check_path(*slider_path("B", cp), (0, 0), (100, 100), 200)
+
+
+def test_catmull():
+    cp = [(0, 0), (100, 50), (200, 0), (300, 50)]
+    pts, dists = slider_path("C", cp)
+    check_path(pts, dists, (0, 0), (300, 50), dists[-1])
+    # the curve passes through every control point
+    for p in cp:
+        assert np.hypot(*(pts - p).T).min() < 1e-6
+    assert dists[-1] >= dense_length(np.asarray(cp, dtype=np.float64))
+
+    pts, dists = slider_path("C", cp, 250)
+    assert dists[-1] == pytest.approx(250)
+    assert np.allclose(pts[0], (0, 0))
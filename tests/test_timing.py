@@ -0,0 +1,63 @@
+import random
+
+import numpy as np
+import pytest
+
+from modules.read_map import (TimingPoint, TimingIndex, Slider, compute_slider_timings,
+                              get_active_uninherited_timing, get_active_inherited_timing)
+
+
+def timing_points(rng, n_red, n_green):
+    points = []
+    for _ in range(n_red):
+        points.append(TimingPoint(rng.randrange(0, 100000), rng.uniform(200, 800), 4, 0, 0, 100, True, 0))
+    for _ in range(n_green):
+        beat_length = rng.choice([0.0, rng.uniform(-400, -25)])
+        points.append(TimingPoint(rng.randrange(0, 100000), beat_length, 4, 0, 0, 100, False, 0))
+    # the linear lookups assume time order
+    points.sort(key=lambda tp: tp.time)
+    return points
+
+
+def linear_slider_timing(points, time, length, slides, slider_multiplier):
+    """Slider duration the way it was computed before TimingIndex."""
+    utp = get_active_uninherited_timing(points, time)
+    beat_length = 500.0 if utp is None else utp.beat_length
+    itp = get_active_inherited_timing(points, time)
+    sv = 1.0 if itp is None or itp.beat_length == 0 else 100.0 / abs(itp.beat_length)
+    return (length * slides) / (slider_multiplier * 100.0 * sv) * beat_length
+
+
+CASES = [(0, 0), (1, 0), (0, 3), (5, 20), (30, 200)]
+
+
+@pytest.mark.parametrize("n_red, n_green", CASES)
+def test_point_lookups_match_linear_scan(n_red, n_green):
+    rng = random.Random(n_red * 1000 + n_green)
+    points = timing_points(rng, n_red, n_green)
+    index = TimingIndex(points)
+    queries = [-1, 0, 100000, 200000] + [tp.time for tp in points] + [rng.randrange(-500, 101000) for _ in range(500)]
+    for t in queries:
+        assert index.uninherited_at(t) is get_active_uninherited_timing(points, t)
+        assert index.inherited_at(t) is get_active_inherited_timing(points, t)
+
+
+@pytest.mark.parametrize("n_red, n_green", CASES)
+def test_slider_timings_match_linear_scan(n_red, n_green):
+    rng = random.Random(n_red * 1000 + n_green + 1)
+    points = timing_points(rng, n_red, n_green)
+    sliders = [Slider(0, 0, rng.randrange(-500, 101000), 2, 0, "L", [(100, 0)],
+                      rng.randint(1, 4), rng.uniform(10, 500), [], [], "")
+               for _ in range(300)]
+    compute_slider_timings(sliders, points, 1.4)
+
+    expected = np.array([linear_slider_timing(points, s.time, s.length, s.slides, 1.4) for s in sliders])
+    assert np.allclose([s.duration_ms for s in sliders], expected, rtol=1e-12)
+    assert [s.end_time for s in sliders] == [int(round(s.time + d)) for s, d in zip(sliders, expected)]
+
+    # the single-slider path agrees with the batch one
+    index = TimingIndex(points)
+    for s in sliders[:20]:
+        duration_ms, end_time = s.duration_ms, s.end_time
+        index.slider_timing(s, 1.4)
+        assert (s.duration_ms, s.end_time) == (pytest.approx(duration_ms, rel=1e-12), end_time)